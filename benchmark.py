@@ -0,0 +1,345 @@
+"""
+Banco de pruebas - synthetic grammars and inputs for timing the parsers
+
+Each grammar family is a function of one size parameter returning
+(productions, start symbol) with named symbols:
+
+    ladder       expression grammar with one left-recursive level per operator
+    ladder-ll    the same language with the left recursion removed
+    chain        a long chain of nonterminals, each optionally led by a terminal
+    alternation  a list of items chosen from many alternatives with epsilon tails
+
+For every grammar the harness reports the time spent in FIRST, FOLLOW, the
+LL(1) table and the SLR(1) automaton (where the LR(0) closures are built),
+the size of the tables, the peak memory of each step and the throughput of
+the two parse drivers on accepted and rejected strings of a given length.
+--json writes the results so that runs on two commits can be compared with
+--compare.
+"""
+
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+from project import Grammar, LL1Table, SLRAutomaton
+
+
+def expression_ladder(levels):
+    """E_i -> E_i 'op_i' E_i+1 | E_i+1 for each level, E_n -> '(' E_0 ')' | 'id'"""
+    productions = {}
+    for i in range(levels):
+        below = 'E%d' % (i + 1)
+        productions['E%d' % i] = [['E%d' % i, 'op%d' % i, below], [below]]
+    productions['E%d' % levels] = [['(', 'E0', ')'], ['id']]
+    return productions, 'E0'
+
+
+def ll_expression_ladder(levels):
+    """expression_ladder rewritten as E_i -> E_i+1 R_i, R_i -> 'op_i' E_i+1 R_i | ε"""
+    productions = {}
+    for i in range(levels):
+        below = 'E%d' % (i + 1)
+        productions['E%d' % i] = [[below, 'R%d' % i]]
+        productions['R%d' % i] = [['op%d' % i, below, 'R%d' % i], []]
+    productions['E%d' % levels] = [['(', 'E0', ')'], ['id']]
+    return productions, 'E0'
+
+
+def chain(length):
+    """N_i -> N_i+1 | 'a_i' N_i+1 for each link, N_n -> 'z' | '(' N_0 ')'"""
+    productions = {}
+    for i in range(length):
+        below = 'N%d' % (i + 1)
+        productions['N%d' % i] = [[below], ['a%d' % i, below]]
+    productions['N%d' % length] = [['z'], ['(', 'N0', ')']]
+    return productions, 'N0'
+
+
+def alternation(width):
+    """S -> I S | ε, I -> 't_i' O_i for each alternative, O_i -> 'u_i' | ε"""
+    productions = {'S': [['I', 'S'], []], 'I': []}
+    for i in range(width):
+        productions['I'].append(['t%d' % i, 'O%d' % i])
+        productions['O%d' % i] = [['u%d' % i], []]
+    return productions, 'S'
+
+
+FAMILIES = {
+    'ladder': expression_ladder,
+    'ladder-ll': ll_expression_ladder,
+    'chain': chain,
+    'alternation': alternation,
+}
+
+
+def _yield_length(prod, lengths):
+    """Length of the shortest sentence derived from a production"""
+    return sum(lengths[symbol] if symbol in lengths else 1 for symbol in prod)
+
+
+def _shortest_productions(productions):
+    """Return the length of the shortest sentence of each nonterminal and the
+    production to expand to get it"""
+    
+    lengths = {nt: float('inf') for nt in productions}
+    shortest = {}
+    changed = True
+    while changed:
+        changed = False
+        for nt, prods in productions.items():
+            for i, prod in enumerate(prods):
+                length = _yield_length(prod, lengths)
+                # Only strict improvements, so that following the chosen
+                # productions always terminates
+                if length < lengths[nt]:
+                    lengths[nt] = length
+                    shortest[nt] = i
+                    changed = True
+    return lengths, shortest
+
+
+def random_sentence(productions, start, length, rng, shortest=None):
+    """Return a random sentence of the grammar with about ``length`` terminals.
+    
+    Productions are picked at random, preferring those with nonterminals,
+    while the sentence can still grow; after that every nonterminal is
+    expanded by its shortest production.
+    """
+    
+    lengths, shortest = shortest or _shortest_productions(productions)
+    sentence = []
+    stack = [start]
+    
+    # Length of the sentence if every pending symbol took its shortest form
+    floor = lengths[start]
+    while stack:
+        symbol = stack.pop()
+        if symbol not in productions:
+            sentence.append(symbol)
+            continue
+        
+        prods = productions[symbol]
+        floor -= lengths[symbol]
+        if floor + lengths[symbol] < length:
+            growing = [prod for prod in prods
+                       if any(s in productions for s in prod)
+                       and _yield_length(prod, lengths) < float('inf')]
+            prod = rng.choice(growing or prods)
+        else:
+            prod = prods[shortest[symbol]]
+        
+        floor += _yield_length(prod, lengths)
+        stack.extend(reversed(prod))
+    return sentence
+
+
+def near_miss(sentence, terminals, rng):
+    """Return the sentence with one terminal deleted, inserted or replaced"""
+    sentence = list(sentence)
+    edit = rng.randrange(3) if sentence else 1
+    pos = rng.randrange(len(sentence) + (edit == 1))
+    if edit == 0:
+        del sentence[pos]
+    elif edit == 1:
+        sentence.insert(pos, rng.choice(terminals))
+    else:
+        sentence[pos] = rng.choice(terminals)
+    return sentence
+
+
+def generate_inputs(grammar, length, count, rng, accepts):
+    """Return ``count`` accepted sentences and up to ``count`` rejected ones.
+    
+    Rejected strings are near misses of accepted ones, checked with the
+    recognizer ``accepts``.
+    """
+    
+    shortest = _shortest_productions(grammar.productions)
+    terminals = sorted(grammar.terminals - {'$'})
+    accepted = [random_sentence(grammar.productions, grammar.start, length, rng, shortest)
+                for _ in range(count)]
+    
+    rejected = []
+    for sentence in accepted:
+        for _ in range(20):
+            candidate = near_miss(sentence, terminals, rng)
+            if not accepts(candidate):
+                rejected.append(candidate)
+                break
+    return accepted, rejected
+
+
+def _best_time(function, repeat):
+    """Best wall time of ``repeat`` calls of function(), and its last result"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _peak_memory(function):
+    """Peak memory allocated by Python objects during function(), in bytes"""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(family, size, length=50, count=200, repeat=3, seed=0):
+    """Build one grammar of a family and return a dict with its measurements"""
+    
+    productions, start = FAMILIES[family](size)
+    nonterminals = set(productions)
+    
+    def analyse():
+        return Grammar(productions, start, nonterminals)
+    
+    grammar = analyse()
+    
+    times = {}
+    times['analysis'], _ = _best_time(analyse, repeat)
+    times['first'], _ = _best_time(grammar.compute_first_sets, repeat)
+    times['follow'], _ = _best_time(grammar.compute_follow_sets, repeat)
+    times['ll1_table'], ll1_table = _best_time(lambda: LL1Table(grammar), repeat)
+    times['slr1_automaton'], automaton = _best_time(lambda: SLRAutomaton(grammar), repeat)
+    
+    memory = {
+        'analysis': _peak_memory(analyse),
+        'll1_table': _peak_memory(lambda: LL1Table(grammar)),
+        'slr1_automaton': _peak_memory(lambda: SLRAutomaton(grammar)),
+    }
+    
+    result = {
+        'family': family,
+        'size': size,
+        'nonterminals': len(grammar.nonterminals),
+        'terminals': len(grammar.terminals),
+        'productions': sum(len(prods) for prods in productions.values()),
+        'll1': ll1_table.is_ll1(),
+        'slr1': automaton.is_slr1(),
+        'll1_cells': sum(len(row) for row in ll1_table.table.values()),
+        'slr1_states': len(automaton.kernels),
+        'slr1_items': sum(len(automaton.items(i)) for i in range(len(automaton.kernels))),
+        'time': times,
+        'peak_memory': memory,
+        'parse': {},
+    }
+    
+    # LL(1) parsing only terminates on LL(1) grammars, so the drivers are
+    # only timed on the grammars they accept
+    compiled = [(kind, table) for kind, table in (('LL1', ll1_table), ('SLR1', automaton))
+                if table.conflicts == []]
+    if not compiled:
+        return result
+    
+    rng = random.Random(seed)
+    accepted, rejected = generate_inputs(grammar, length, count, rng, compiled[0][1].parse)
+    for kind, table in compiled:
+        for label, strings in (('accepted', accepted), ('rejected', rejected)):
+            parse = table.parse
+            elapsed, answers = _best_time(lambda: [parse(s) for s in strings], repeat)
+            if any(answer != (label == 'accepted') for answer in answers):
+                raise AssertionError("%s parser misjudged a generated %s string" % (kind, label))
+            symbols = sum(len(s) for s in strings)
+            result['parse']['%s/%s' % (kind, label)] = {
+                'strings': len(strings),
+                'symbols': symbols,
+                'seconds': elapsed,
+                'strings_per_s': len(strings) / elapsed if elapsed else None,
+                'symbols_per_s': symbols / elapsed if elapsed else None,
+            }
+    return result
+
+
+def compare(old, new):
+    """Yield (family, size, step, old seconds, new seconds) for every timing
+    present in both result lists"""
+    
+    old_results = {(r['family'], r['size']): r for r in old}
+    for result in new:
+        before = old_results.get((result['family'], result['size']))
+        if before is None:
+            continue
+        for step, seconds in result['time'].items():
+            if step in before['time']:
+                yield result['family'], result['size'], step, before['time'][step], seconds
+        # Parse timings are compared per string, as runs may use other counts
+        for kind, stats in result['parse'].items():
+            old_stats = before['parse'].get(kind)
+            if old_stats and old_stats['strings'] and stats['strings']:
+                yield (result['family'], result['size'], kind,
+                       old_stats['seconds'] / old_stats['strings'],
+                       stats['seconds'] / stats['strings'])
+
+
+def _print_result(result):
+    print("%s %d: %d nonterminals, %d terminals, %d productions, LL(1)=%s SLR(1)=%s" % (
+        result['family'], result['size'], result['nonterminals'], result['terminals'],
+        result['productions'], result['ll1'], result['slr1']))
+    print("    %d LL(1) cells, %d SLR(1) states, %d LR(0) items" % (
+        result['ll1_cells'], result['slr1_states'], result['slr1_items']))
+    for step, seconds in result['time'].items():
+        line = "    %-16s %10.6f s" % (step, seconds)
+        if step in result['peak_memory']:
+            line += "  %10.1f KiB peak" % (result['peak_memory'][step] / 1024)
+        print(line)
+    for kind, stats in result['parse'].items():
+        print("    %-16s %10.0f strings/s  %12.0f symbols/s" % (
+            kind, stats['strings_per_s'] or 0, stats['symbols_per_s'] or 0))
+
+
+def main(argv=None):
+    """Time grammar analysis, table construction and parsing on synthetic grammars"""
+    
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--family', choices=sorted(FAMILIES), action='append',
+                        help="grammar family to run (repeatable; default: all)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 16, 64],
+                        help="size parameters of the grammars")
+    parser.add_argument('--length', type=int, default=50,
+                        help="approximate number of terminals per input string")
+    parser.add_argument('--count', type=int, default=200,
+                        help="accepted strings per grammar, plus as many near misses")
+    parser.add_argument('--repeat', type=int, default=3, help="keep the best of N runs")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='FILE', help="write the results to FILE")
+    parser.add_argument('--compare', metavar='FILE',
+                        help="compare the timings with a results file of an earlier run")
+    args = parser.parse_args(argv)
+    
+    results = []
+    for family in args.family or FAMILIES:
+        for size in args.sizes:
+            result = measure(family, size, args.length, args.count, args.repeat, args.seed)
+            _print_result(result)
+            results.append(result)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'arguments': {'length': args.length, 'count': args.count,
+                              'repeat': args.repeat, 'seed': args.seed},
+                'results': results,
+            }, f, indent=1)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)['results']
+        print()
+        print("%-12s %6s %-16s %12s %12s %8s" % ('family', 'size', 'step', 'before', 'after', 'ratio'))
+        for family, size, step, before, after in compare(old, results):
+            print("%-12s %6d %-16s %12.6f %12.6f %8.2f" % (
+                family, size, step, before, after, after / before if before else float('inf')))
+
+
+if __name__ == "__main__":
+    main()
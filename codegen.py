@@ -0,0 +1,331 @@
+"""
+Generador de reconocedores - emits a standalone Python module per grammar
+
+The LL(1) module is a recursive-descent recognizer: one function per
+nonterminal with the lookahead sets inlined as comparisons, and tail
+self-recursion turned into a loop. The SLR(1) module is a state machine
+with the ACTION/GOTO tables inlined as literals. Neither imports project.py;
+grammars with a tokenizer get a copy of its master regular expression, so
+their modules accept raw text as well as sequences of terminal names.
+"""
+
+import argparse
+import time
+
+from project import LL1Table, SLRAutomaton, load_grammar_file, read_file_lines
+
+
+def _is_epsilon(prod):
+    return not prod or (len(prod) == 1 and prod[0] == 'e')
+
+
+def _scanner_lines(tokenizer):
+    """Source of a _scan(text) function equivalent to Tokenizer.scan"""
+    return [
+        '_TOKEN = re.compile(%r)' % tokenizer._master.pattern,
+        '_LITERALS = %r' % (frozenset(tokenizer.literals),),
+        '_PATTERN_NAMES = %r' % (tokenizer._pattern_names,),
+        '',
+        '',
+        'def _scan(text):',
+        '    tokens = []',
+        '    match = _TOKEN.match',
+        '    pos = 0',
+        '    while pos < len(text):',
+        '        found = match(text, pos)',
+        '        if found is None or found.end() == pos:',
+        '            # No token starts here; None matches no terminal',
+        '            tokens.append(None)',
+        '            break',
+        '        pos = found.end()',
+        '        kind = found.lastgroup',
+        "        if kind == '_skip':",
+        '            continue',
+        '        token = found.group()',
+        "        if kind != '_literal' and token not in _LITERALS:",
+        '            token = _PATTERN_NAMES[kind]',
+        '        tokens.append(token)',
+        '    return tokens',
+    ]
+
+
+def _header_lines(grammar, title):
+    """Module docstring, plus the scanner when the grammar has a tokenizer"""
+    lines = ['"""%s recognizer generated by codegen.py; do not edit."""' % title]
+    if grammar.tokenizer is not None:
+        lines += ['', 'import re', ''] + _scanner_lines(grammar.tokenizer) + ['', '']
+    else:
+        lines.append('')
+    return lines
+
+
+def _accepts_prologue(grammar):
+    """First lines of accepts(): tokenize raw text and add the final $"""
+    lines = [
+        'def accepts(text):',
+        '    """Return whether text, a string or a sequence of terminals, is in the language"""',
+    ]
+    if grammar.tokenizer is not None:
+        lines += [
+            '    if text.__class__ is str:',
+            '        text = _scan(text)',
+        ]
+    lines += [
+        "    if not text or text[-1] != '$':",
+        "        text = text + '$' if text.__class__ is str else list(text) + ['$']",
+    ]
+    return lines
+
+
+def _lookahead_test(terminals):
+    """Python condition testing the lookahead character c against terminals"""
+    terminals = sorted(terminals)
+    if len(terminals) == 1:
+        return 'c == %r' % terminals[0]
+    return 'c in {%s}' % ', '.join(repr(t) for t in terminals)
+
+
+def generate_ll1(grammar):
+    """Return the source of a recursive-descent recognizer for an LL(1) grammar"""
+    
+    table = LL1Table(grammar)
+    if not table.is_ll1():
+        raise ValueError("grammar is not LL(1)")
+    
+    nonterminals = sorted(grammar.nonterminals)
+    ids = {nt: i for i, nt in enumerate(nonterminals)}
+    
+    def stack_symbol(symbol):
+        return ids[symbol] if symbol in ids else symbol
+    
+    # Fallback table: nonterminal id -> {lookahead: symbols to push, reversed}
+    predict = {}
+    for nt in nonterminals:
+        row = {}
+        for terminal, (prod_idx, prod) in sorted(table.table[nt].items()):
+            row[terminal] = () if _is_epsilon(prod) else tuple(
+                stack_symbol(symbol) for symbol in reversed(prod))
+        predict[ids[nt]] = row
+    
+    lines = _header_lines(grammar, 'LL(1)') + [
+        '# Table for inputs nested too deeply for the recursive descent:',
+        '# nonterminal id -> {lookahead: symbols to push, reversed}',
+        '_PREDICT = %r' % (predict,),
+    ]
+    
+    for nt in nonterminals:
+        lines += ['', '']
+        lines.append('def _n%d(text, pos):  # %s' % (ids[nt], nt))
+        
+        # Group the lookaheads of each production
+        lookaheads = {}
+        for terminal, (prod_idx, prod) in table.table[nt].items():
+            lookaheads.setdefault(prod_idx, set()).add(terminal)
+        if not lookaheads:
+            lines.append('    return -1')
+            continue
+        
+        lines.append('    while True:')
+        lines.append('        c = text[pos]')
+        keyword = 'if'
+        for prod_idx in sorted(lookaheads):
+            prod = grammar.productions[nt][prod_idx]
+            lines.append('        %s %s:' % (keyword, _lookahead_test(lookaheads[prod_idx])))
+            keyword = 'elif'
+            
+            body = [] if _is_epsilon(prod) else list(prod)
+            tail_call = bool(body) and body[-1] == nt
+            if tail_call:
+                body.pop()
+            
+            for k, symbol in enumerate(body):
+                if symbol in ids:
+                    lines.append('            pos = _n%d(text, pos)' % ids[symbol])
+                    lines.append('            if pos < 0:')
+                    lines.append('                return -1')
+                elif k == 0:
+                    # The lookahead test already matched this terminal
+                    lines.append('            pos += 1')
+                else:
+                    lines.append('            if text[pos] != %r:' % symbol)
+                    lines.append('                return -1')
+                    lines.append('            pos += 1')
+            lines.append('            continue' if tail_call else '            return pos')
+        lines.append('        return -1')
+    
+    lines += [
+        '',
+        '',
+        'def _accepts_stack(text):',
+        '    stack = [%r, %r]' % ('$', ids[grammar.start]),
+        '    pos = 0',
+        '    while stack:',
+        '        top = stack.pop()',
+        '        if top.__class__ is str:',
+        '            if top != text[pos]:',
+        '                return False',
+        '            pos += 1',
+        "            if top == '$':",
+        '                return pos == len(text)',
+        '        else:',
+        '            rhs = _PREDICT[top].get(text[pos])',
+        '            if rhs is None:',
+        '                return False',
+        '            stack.extend(rhs)',
+        '    return False',
+        '',
+        '',
+    ] + _accepts_prologue(grammar) + [
+        '    try:',
+        '        pos = _n%d(text, 0)' % ids[grammar.start],
+        '    except RecursionError:',
+        '        return _accepts_stack(text)',
+        '    return pos == len(text) - 1',
+        '',
+    ]
+    return '\n'.join(lines)
+
+
+def generate_slr1(grammar):
+    """Return the source of a table-inlined state machine for an SLR(1) grammar"""
+    
+    automaton = SLRAutomaton(grammar)
+    if not automaton.is_slr1():
+        raise ValueError("grammar is not SLR(1)")
+    
+    # Rule 0 is S' -> S and means accept
+    rules = [("S'", 0)]
+    for nt, prods in grammar.productions.items():
+        rules.extend((nt, i) for i in range(len(prods)))
+    rule_ids = {rule: i for i, rule in enumerate(rules)}
+    
+    # ACTION: state -> {lookahead: target + 1 for shift, ~rule for reduce}
+    action = []
+    for row in automaton.action:
+        codes = {}
+        for terminal, (act, value) in sorted(row.items()):
+            if act == 'shift':
+                codes[terminal] = value + 1
+            elif act == 'reduce':
+                codes[terminal] = ~rule_ids[value]
+            else:  # accept
+                codes[terminal] = ~0
+        action.append(codes)
+    
+    # REDUCE: rule -> (symbols to pop, {state below: goto target})
+    reduce = [(1, {})]
+    for nt, prod_idx in rules[1:]:
+        prod = grammar.productions[nt][prod_idx]
+        gotos = {state: row[nt] for state, row in enumerate(automaton.goto_table) if nt in row}
+        reduce.append((0 if _is_epsilon(prod) else len(prod), gotos))
+    
+    return '\n'.join(_header_lines(grammar, 'SLR(1)') + [
+        '# state -> {lookahead: target + 1 for shift, ~rule for reduce, -1 to accept}',
+        '_ACTION = %r' % (tuple(action),),
+        '',
+        '# rule -> (symbols to pop, {state below: goto target})',
+        '_REDUCE = %r' % (tuple(reduce),),
+        '',
+        '',
+    ] + _accepts_prologue(grammar) + [
+        '    action = _ACTION',
+        '    reduce = _REDUCE',
+        '    stack = [0]',
+        '    row = action[0]',
+        '    pos = 0',
+        '    while True:',
+        '        act = row.get(text[pos], 0)',
+        '        if act > 0:',
+        '            state = act - 1',
+        '            stack.append(state)',
+        '            pos += 1',
+        '        elif act < 0:',
+        '            if act == -1:',
+        '                return True',
+        '            n, gotos = reduce[~act]',
+        '            if n:',
+        '                del stack[-n:]',
+        '            state = gotos.get(stack[-1], 0)',
+        '            if not state:',
+        '                return False',
+        '            stack.append(state)',
+        '        else:',
+        '            return False',
+        '        row = action[state]',
+        '',
+    ])
+
+
+def generate(grammar, parser_type):
+    """Return the source of a recognizer module for 'LL1' or 'SLR1'"""
+    if parser_type == 'LL1':
+        return generate_ll1(grammar)
+    return generate_slr1(grammar)
+
+
+def load_generated(source):
+    """Execute generated source and return its accepts() function"""
+    namespace = {}
+    exec(compile(source, '<generated>', 'exec'), namespace)
+    return namespace['accepts']
+
+
+def benchmark(grammar, parser_type, strings, repeat=3):
+    """Time the interpreted driver and the generated module on the same strings.
+    
+    Returns the best time of each over ``repeat`` runs, in seconds, after
+    checking that both give the same answers.
+    """
+    interpreted = grammar.compile_parser(parser_type).parse
+    generated = load_generated(generate(grammar, parser_type))
+    
+    if [interpreted(s) for s in strings] != [generated(s) for s in strings]:
+        raise AssertionError("generated recognizer disagrees with the interpreted driver")
+    
+    results = {}
+    for name, parse in (('interpreted', interpreted), ('generated', generated)):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for string in strings:
+                parse(string)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = best
+    return results
+
+
+def main(argv=None):
+    """Generate a recognizer module, or compare it with the interpreted driver"""
+    
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('grammar', help="grammar file in the project input format or the named format")
+    parser.add_argument('--parser', choices=('LL1', 'SLR1'), default='LL1')
+    parser.add_argument('-o', '--output', metavar='FILE', help="write the module to FILE")
+    parser.add_argument('--benchmark', metavar='CORPUS',
+                        help="time both recognizers on the strings of CORPUS, one per line")
+    args = parser.parse_args(argv)
+    
+    grammar = load_grammar_file(args.grammar)
+    try:
+        source = generate(grammar, args.parser)
+    except ValueError as error:
+        parser.error(str(error))
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(source)
+    
+    if args.benchmark:
+        strings = [line for line in read_file_lines(args.benchmark) if line]
+        results = benchmark(grammar, args.parser, strings)
+        symbols = sum(len(s) for s in strings)
+        for name, elapsed in results.items():
+            print("%-12s %8.3f s  %10.0f strings/s  %12.0f symbols/s" % (
+                name, elapsed, len(strings) / elapsed, symbols / elapsed))
+    elif not args.output:
+        print(source)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""
+Generador de corpus - random sentences of a grammar, of a chosen length, for load tests
+
+The number of derivations of every length from every nonterminal is
+counted once, by dynamic programming, and sentences are then drawn
+uniformly among the derivations of the requested length:
+
+    python corpus.py grammar.txt --length 40 --count 1000000 > strings.txt
+    python project.py --batch --grammar grammar.txt < strings.txt
+
+(a grammar that is both LL(1) and SLR(1) needs the parser choice, T or B,
+on the first line of the strings).
+
+--near-miss-rate mixes in mutated sentences (one terminal deleted,
+inserted, replaced or swapped with its neighbour) that the grammar
+rejects. Sentences are written one per line as they are drawn. In named
+grammars the tokens are separated by spaces and every token class
+(%token) is written as one of --lexemes texts drawn from its regular
+expression (with the rest of the sentence's randomness, so --seed fixes
+them too) that the grammar's tokenizer reads back as that token.
+
+Drawing these texts walks the parsed form of each regular expression,
+which needs the re module's internal parser (re._parser, or sre_parse
+before Python 3.11).
+"""
+
+import argparse
+import random
+import re
+import sys
+from bisect import bisect_right
+from itertools import accumulate
+from operator import mul
+
+from project import load_grammar_file
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    try:
+        import sre_parse
+    except ImportError:
+        raise ImportError("corpus.py needs the re module's internal parser "
+                          "(re._parser or sre_parse) to draw token texts")
+
+
+_PRINTABLE = [chr(code) for code in range(32, 127)]
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: re.compile(r'\d'),
+    sre_parse.CATEGORY_NOT_DIGIT: re.compile(r'\D'),
+    sre_parse.CATEGORY_SPACE: re.compile(r'\s'),
+    sre_parse.CATEGORY_NOT_SPACE: re.compile(r'\S'),
+    sre_parse.CATEGORY_WORD: re.compile(r'\w'),
+    sre_parse.CATEGORY_NOT_WORD: re.compile(r'\W'),
+}
+
+_REPEATS = tuple(op for op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT,
+                               getattr(sre_parse, 'POSSESSIVE_REPEAT', None)) if op is not None)
+
+
+def _char_choices(op, value):
+    """Printable characters (and the ones a set names) matched by one
+    ANY, NOT_LITERAL or IN item of a parsed regular expression"""
+    if op is sre_parse.ANY:
+        return _PRINTABLE
+    if op is sre_parse.NOT_LITERAL:
+        return [char for char in _PRINTABLE if ord(char) != value]
+    
+    negate = False
+    named = []
+    for item, argument in value:
+        if item is sre_parse.NEGATE:
+            negate = True
+        elif item is sre_parse.LITERAL:
+            named.append(chr(argument))
+        elif item is sre_parse.RANGE:
+            named.extend(map(chr, argument))
+    
+    def member(char):
+        for item, argument in value:
+            if (item is sre_parse.LITERAL and ord(char) == argument
+                    or item is sre_parse.RANGE and argument[0] <= ord(char) <= argument[1]
+                    or item is sre_parse.CATEGORY and _CATEGORIES[argument].match(char)):
+                return not negate
+        return negate
+    
+    return [char for char in dict.fromkeys(named + _PRINTABLE) if member(char)]
+
+
+def _sample_regex(regex, rng, extra=3):
+    """Return a random string for a regular expression, repeating open
+    ended items at most ``extra`` times more than their minimum.
+    
+    Anchors and lookarounds are ignored, so the string is only a candidate
+    that the caller has to check.
+    """
+    out = []
+    groups = {}
+    
+    def emit(items):
+        for op, value in items:
+            if op is sre_parse.LITERAL:
+                out.append(chr(value))
+            elif op in (sre_parse.ANY, sre_parse.NOT_LITERAL, sre_parse.IN):
+                out.append(rng.choice(_char_choices(op, value)))
+            elif op is sre_parse.BRANCH:
+                emit(rng.choice(value[1]))
+            elif op is sre_parse.SUBPATTERN:
+                start = len(out)
+                emit(value[-1])
+                groups[value[0]] = ''.join(out[start:])
+            elif op in _REPEATS:
+                low, high, body = value
+                high = low + extra if high is sre_parse.MAXREPEAT else min(high, low + extra)
+                for _ in range(rng.randint(low, high)):
+                    emit(body)
+            elif op is sre_parse.GROUPREF:
+                out.append(groups.get(value, ''))
+            elif op is getattr(sre_parse, 'ATOMIC_GROUP', None):
+                emit(value)
+    
+    emit(sre_parse.parse(regex))
+    return ''.join(out)
+
+
+def _sample_lexemes(tokenizer, name, regex, rng, size=8, attempts=64):
+    """Return up to ``size`` texts the tokenizer reads as the single token
+    ``name``, or raise ValueError if none is found"""
+    lexemes = []
+    for _ in range(max(attempts, 8 * size)):
+        try:
+            lexeme = _sample_regex(regex, rng)
+        except (IndexError, re.error):
+            continue
+        if lexeme not in lexemes and list(tokenizer.scan(lexeme)) == [name]:
+            lexemes.append(lexeme)
+            if len(lexemes) == size:
+                break
+    if not lexemes:
+        raise ValueError("cannot write a %s token: no text drawn from /%s/ is read back as %s"
+                         % (name, regex, name))
+    return lexemes
+
+
+class SentenceGenerator:
+    """Uniform random sentences of a Grammar, by number of terminals.
+    
+    count(symbol, n) is the number of derivation trees of a string of n
+    terminals from symbol. A sentence is drawn top-down: a production with
+    probability proportional to its count, then how many terminals each of
+    its symbols yields, so every derivation of the start symbol with n
+    terminals is equally likely (every sentence, if the grammar is
+    unambiguous). The cumulative weights of each choice are kept, so once
+    the counts up to n are known a sentence costs at most one bisection per
+    node of its derivation, and none where the choice is forced.
+    
+    A nonterminal that derives itself without adding terminals (A -> A, or
+    A -> B A with B nullable) has infinitely many derivations; counting
+    raises ValueError for such grammars.
+    
+    Token classes of a tokenizer are written as one of up to
+    ``lexemes_per_token`` texts drawn with ``rng`` from their patterns.
+    """
+    
+    def __init__(self, grammar, rng=random, lexemes_per_token=8):
+        self.grammar = grammar
+        self.nonterminals = grammar.nonterminals
+        
+        # Productions numbered in order, with the empty production as ()
+        self.productions = []
+        self.rules = {nt: [] for nt in grammar.nonterminals}
+        for nt, prods in grammar.productions.items():
+            for prod in prods:
+                symbols = () if prod == ['e'] else tuple(prod)
+                self.rules[nt].append(len(self.productions))
+                self.productions.append((nt, symbols))
+        
+        # counts[nt][n] and suffix_counts[p][k][n]: derivations of n terminals
+        # from nt and from symbols k.. of production p; the empty suffix
+        # only derives the empty string
+        self.counts = {nt: [] for nt in self.nonterminals}
+        self.suffix_counts = [[[] for _ in range(len(symbols) + 1)]
+                              for _, symbols in self.productions]
+        self.max_length = -1
+        
+        self._order, self._cyclic = self._length_order()
+        
+        # Texts of the token classes of a tokenizer, written between spaces
+        # when the tokenizer skips them; other terminals are their own text
+        self.lexemes = {}
+        self.separator = ''
+        tokenizer = grammar.tokenizer
+        if tokenizer is not None:
+            if not list(tokenizer.scan(' ')):
+                self.separator = ' '
+            for name, regex in tokenizer.patterns:
+                if name in grammar.terminals and name not in tokenizer.literals:
+                    self.lexemes[name] = _sample_lexemes(tokenizer, name, regex, rng,
+                                                         lexemes_per_token)
+        
+        # Cumulative weights of the choices made while sampling
+        self._production_choices = {}
+        self._split_choices = {}
+    
+    def _length_order(self):
+        """Order the nonterminals so that the ones a nonterminal can become
+        without adding terminals are counted first.
+        
+        Returns the order and whether these dependencies have a cycle, in
+        which case one pass over a length is not enough.
+        """
+        
+        # Nullable nonterminals
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for nt, symbols in self.productions:
+                if nt not in nullable and all(s in nullable for s in symbols):
+                    nullable.add(nt)
+                    changed = True
+        
+        # nt -> the nonterminals it can become with every other symbol empty
+        same_length = {nt: set() for nt in self.nonterminals}
+        for nt, symbols in self.productions:
+            for k, symbol in enumerate(symbols):
+                if symbol in self.nonterminals and all(
+                        s in nullable for s in symbols[:k] + symbols[k + 1:]):
+                    same_length[nt].add(symbol)
+        
+        # Depth-first postorder; a back edge means a cycle
+        order, state, cyclic = [], {}, False
+        for root in sorted(self.nonterminals):
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(sorted(same_length[root])))]
+            while stack:
+                nt, successors = stack[-1]
+                for successor in successors:
+                    if successor not in state:
+                        state[successor] = 1
+                        stack.append((successor, iter(sorted(same_length[successor]))))
+                        break
+                    cyclic = cyclic or state[successor] == 1
+                else:
+                    stack.pop()
+                    state[nt] = 2
+                    order.append(nt)
+        return order, cyclic
+    
+    def _count_production(self, p, n):
+        """Count the derivations of n terminals from every suffix of production p"""
+        symbols = self.productions[p][1]
+        suffixes = self.suffix_counts[p]
+        for k in range(len(symbols) - 1, -1, -1):
+            after = suffixes[k + 1]
+            if symbols[k] in self.nonterminals:
+                # Sum over the m terminals symbol k derives
+                suffixes[k][n] = sum(map(mul, self.counts[symbols[k]], after[n::-1]))
+            else:
+                suffixes[k][n] = after[n - 1] if n else 0
+        return suffixes[0][n]
+    
+    def _count_length(self, n):
+        """Add the counts of length n; all shorter lengths are known"""
+        counts = self.counts
+        for nt in self.nonterminals:
+            counts[nt].append(0)
+        for suffixes in self.suffix_counts:
+            for suffix in suffixes[:-1]:
+                suffix.append(0)
+            suffixes[-1].append(int(n == 0))
+        
+        # Without cycles one pass in dependency order is exact; with them,
+        # repeat until nothing changes, which only fails for infinite counts
+        for _ in range(len(self.nonterminals) + 2 if self._cyclic else 1):
+            changed = False
+            for nt in self._order:
+                total = sum(self._count_production(p, n) for p in self.rules[nt])
+                if total != counts[nt][n]:
+                    counts[nt][n] = total
+                    changed = True
+            if not changed:
+                break
+        else:
+            if self._cyclic:
+                raise ValueError("a nonterminal derives itself without terminals; "
+                                 "there are infinitely many derivations of length %d" % n)
+        
+        # Suffixes after a terminal used counts of length n that were not
+        # final yet; the next lengths read them
+        for p in range(len(self.productions)):
+            self._count_production(p, n)
+    
+    def count(self, symbol, length):
+        """Number of derivations of ``length`` terminals from ``symbol``"""
+        if symbol not in self.nonterminals:
+            return int(length == 1)
+        while self.max_length < length:
+            self.max_length += 1
+            self._count_length(self.max_length)
+        return self.counts[symbol][length]
+    
+    def _choice(self, options):
+        """The choice among (weight, value) options: the value itself when it
+        is forced, or the cumulative weights and the values"""
+        options = [(weight, value) for weight, value in options if weight]
+        if len(options) == 1:
+            return options[0][1]
+        return (list(accumulate(weight for weight, _ in options)),
+                [value for _, value in options])
+    
+    def _production_choice(self, nt, n):
+        choice = self._choice((self.suffix_counts[p][0][n], p) for p in self.rules[nt])
+        self._production_choices[nt, n] = choice
+        return choice
+    
+    def _split_choice(self, p, k, n):
+        # Terminals of n going to symbol k of production p (a nonterminal)
+        after = self.suffix_counts[p][k + 1]
+        symbol_counts = self.counts[self.productions[p][1][k]]
+        choice = self._choice((symbol_counts[m] * after[n - m], m) for m in range(n + 1))
+        self._split_choices[p, k, n] = choice
+        return choice
+    
+    def sentence(self, length, rng=random):
+        """Return a uniformly drawn sentence of ``length`` terminals as a list"""
+        
+        start = self.grammar.start
+        if not self.count(start, length):
+            raise ValueError("the grammar has no sentence of length %d" % length)
+        
+        nonterminals, productions = self.nonterminals, self.productions
+        production_choices, split_choices = self._production_choices, self._split_choices
+        randrange = rng.randrange
+        
+        terminals = []
+        stack = [(start, length)]
+        while stack:
+            symbol, n = stack.pop()
+            if symbol not in nonterminals:
+                terminals.append(symbol)
+                continue
+            
+            p = production_choices.get((symbol, n))
+            if p is None:
+                p = self._production_choice(symbol, n)
+            if p.__class__ is tuple:
+                weights, values = p
+                p = values[bisect_right(weights, randrange(weights[-1]))]
+            
+            # Split the n terminals among the symbols, left to right
+            parts = []
+            for k, child in enumerate(productions[p][1]):
+                if child in nonterminals:
+                    m = split_choices.get((p, k, n))
+                    if m is None:
+                        m = self._split_choice(p, k, n)
+                    if m.__class__ is tuple:
+                        weights, values = m
+                        m = values[bisect_right(weights, randrange(weights[-1]))]
+                else:
+                    m = 1
+                parts.append((child, m))
+                n -= m
+            stack.extend(reversed(parts))
+        return terminals
+    
+    def near_miss(self, terminals, rng=random):
+        """Return a copy of a sentence with one terminal deleted, inserted,
+        replaced or swapped with the next one"""
+        
+        alphabet = sorted(self.grammar.terminals - {'$'})
+        mutated = list(terminals)
+        i = rng.randrange(len(mutated) + 1)
+        mutation = rng.randrange(4) if mutated else 1
+        if mutation == 0:
+            del mutated[min(i, len(mutated) - 1)]
+        elif mutation == 1:
+            mutated.insert(i, rng.choice(alphabet))
+        elif mutation == 2:
+            mutated[min(i, len(mutated) - 1)] = rng.choice(alphabet)
+        elif len(mutated) > 1:
+            i = min(i, len(mutated) - 2)
+            mutated[i], mutated[i + 1] = mutated[i + 1], mutated[i]
+        return mutated
+    
+    def text(self, terminals, rng=random):
+        """Write a sentence the way the parsers read it"""
+        lexemes = self.lexemes
+        if lexemes:
+            terminals = [rng.choice(lexemes[terminal]) if terminal in lexemes else terminal
+                         for terminal in terminals]
+        return self.separator.join(terminals)
+    
+    def sentences(self, length, count=None, rng=random, near_miss_rate=0.0,
+                  accepts=None, attempts=20):
+        """Return an iterator over ``count`` sentences (endless by default) as text.
+        
+        ``length`` is a number of terminals or a range of them, drawn
+        uniformly among the lengths the grammar has sentences of. Length 0
+        is left out: its empty line would end a block read by
+        parse_strings. A fraction ``near_miss_rate`` of the sentences are
+        near misses whose text ``accepts`` (by default the LL(1) parser if
+        the grammar is LL(1), else the SLR(1) one) rejects; up to
+        ``attempts`` mutations are tried before a valid sentence is given
+        instead.
+        """
+        
+        lengths = [length] if isinstance(length, int) else list(length)
+        if not any(n > 0 for n in lengths):
+            raise ValueError("sentences of length 0 would be empty lines, which end the input")
+        lengths = [n for n in lengths if n > 0 and self.count(self.grammar.start, n)]
+        if not lengths:
+            raise ValueError("the grammar has no sentence of length %s" % (length,))
+        
+        if near_miss_rate and accepts is None:
+            parser_type = 'LL1' if self.grammar.check_ll1() else 'SLR1'
+            accepts = self.grammar.compile_parser(parser_type).parse
+        
+        # Bad arguments fail here rather than at the first sentence
+        return self._stream(lengths, count, rng, near_miss_rate, accepts, attempts)
+    
+    def _stream(self, lengths, count, rng, near_miss_rate, accepts, attempts):
+        produced = 0
+        while count is None or produced < count:
+            terminals = self.sentence(rng.choice(lengths), rng)
+            text = None
+            if near_miss_rate and rng.random() < near_miss_rate:
+                for _ in range(attempts):
+                    # Judge the text actually written, and never an empty line
+                    text = self.text(self.near_miss(terminals, rng), rng)
+                    if text and not accepts(text):
+                        break
+                    text = None
+            yield text or self.text(terminals, rng)
+            produced += 1
+
+
+def main(argv=None):
+    """Write random sentences of a grammar, one per line"""
+    
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('grammar', help="grammar file, in the project format or the named one")
+    parser.add_argument('--length', type=int, default=20,
+                        help="terminals per sentence (default: %(default)s)")
+    parser.add_argument('--max-length', type=int,
+                        help="draw the length uniformly from --length to this")
+    parser.add_argument('--count', type=int, help="number of sentences (default: endless)")
+    parser.add_argument('--near-miss-rate', type=float, default=0.0, metavar='FRACTION',
+                        help="fraction of rejected near misses among the sentences")
+    parser.add_argument('--lexemes', type=int, default=8, metavar='N',
+                        help="texts drawn for each token class (default: %(default)s)")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--output', '-o', metavar='FILE', help="write to FILE instead of stdout")
+    args = parser.parse_args(argv)
+    
+    if args.lexemes < 1:
+        parser.error("--lexemes must be at least 1")
+    lengths = args.length if args.max_length is None else range(args.length, args.max_length + 1)
+    rng = random.Random(args.seed)
+    try:
+        generator = SentenceGenerator(load_grammar_file(args.grammar), rng, args.lexemes)
+        sentences = generator.sentences(lengths, args.count, rng, args.near_miss_rate)
+    except ValueError as error:
+        parser.error(str(error))
+    
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        lines = []
+        for sentence in sentences:
+            lines.append(sentence)
+            if len(lines) >= 4096:
+                out.write('\n'.join(lines) + '\n')
+                lines = []
+        out.write(''.join(line + '\n' for line in lines))
+    except BrokenPipeError:
+        pass
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,572 +1,3036 @@
-"""
-Proyecto LFC - Gramáticas LL(1) y SLR(1)
-Integrantes: Mariana Sanchez, Sebastian Cañon
-"""
-
-class Grammar:
-    
-    def __init__(self, productions):
-        self.productions = productions
-        self.nonterminals = set()
-        self.terminals = set()
-        
-        # Extract terminals and nonterminals
-        for nt, prods in self.productions.items():
-            self.nonterminals.add(nt)
-            for prod in prods:
-                for symbol in prod:
-                    if symbol.isupper():
-                        self.nonterminals.add(symbol)
-                    elif symbol != 'e':
-                        self.terminals.add(symbol)
-        
-        # Add end-of-input marker
-        self.terminals.add('$')
-        
-        self.first_sets = {}
-        self.follow_sets = {}
-        self.compute_first_sets()
-        self.compute_follow_sets()
-    
-    def compute_first_sets(self):
-        """Compute FIRST sets for all nonterminals and terminals"""
-        
-        # Initialize FIRST sets
-        for nt in self.nonterminals:
-            self.first_sets[nt] = set()
-        
-        # Initialize FIRST sets for terminals
-        for t in self.terminals:
-            self.first_sets[t] = {t}
-        
-        # Special case for epsilon
-        self.first_sets['e'] = {'e'}
-        
-        # Compute FIRST sets
-        changed = True
-        while changed:
-            changed = False
-            for nt, prods in self.productions.items():
-                for prod in prods:
-                    # If production is epsilon, add epsilon to FIRST
-                    if len(prod) == 1 and prod[0] == 'e':
-                        if 'e' not in self.first_sets[nt]:
-                            self.first_sets[nt].add('e')
-                            changed = True
-                        continue
-                    
-                    # For each symbol in the production
-                    curr_idx = 0
-                    can_derive_epsilon = True
-                    
-                    while curr_idx < len(prod) and can_derive_epsilon:
-                        symbol = prod[curr_idx]
-                        can_derive_epsilon = False
-                        
-                        # If symbol is a terminal
-                        if not symbol.isupper():
-                            if symbol != 'e':
-                                if symbol not in self.first_sets[nt]:
-                                    self.first_sets[nt].add(symbol)
-                                    changed = True
-                            break
-                        
-                        # Symbol is a nonterminal
-                        # Add all non-epsilon terminals from FIRST(symbol) to FIRST(nt)
-                        for s in self.first_sets[symbol]:
-                            if s != 'e' and s not in self.first_sets[nt]:
-                                self.first_sets[nt].add(s)
-                                changed = True
-                        
-                        # Check if symbol can derive epsilon
-                        if 'e' in self.first_sets[symbol]:
-                            can_derive_epsilon = True
-                            curr_idx += 1
-                    
-                    # If all symbols can derive epsilon, add epsilon to FIRST(nt)
-                    if curr_idx == len(prod) and can_derive_epsilon:
-                        if 'e' not in self.first_sets[nt]:
-                            self.first_sets[nt].add('e')
-                            changed = True
-    
-    def first_of_string(self, string):
-        """Compute FIRST set for a string of symbols"""
-        
-        if not string or (len(string) == 1 and string[0] == 'e'):
-            return {'e'}
-        
-        result = set()
-        curr_idx = 0
-        can_derive_epsilon = True
-        
-        while curr_idx < len(string) and can_derive_epsilon:
-            symbol = string[curr_idx]
-            can_derive_epsilon = False
-            
-            # Add all non-epsilon terminals from FIRST(symbol) to result
-            if symbol in self.first_sets:
-                for s in self.first_sets[symbol]:
-                    if s != 'e':
-                        result.add(s)
-            
-            # Check if symbol can derive epsilon
-            if symbol in self.first_sets and 'e' in self.first_sets[symbol]:
-                can_derive_epsilon = True
-                curr_idx += 1
-        
-        # If all symbols can derive epsilon, add epsilon to result
-        if curr_idx == len(string) and can_derive_epsilon:
-            result.add('e')
-        
-        return result
-    
-    def compute_follow_sets(self):
-        """Compute FOLLOW sets for all nonterminals"""
-        
-        # Initialize FOLLOW sets
-        for nt in self.nonterminals:
-            self.follow_sets[nt] = set()
-        
-        # Start symbol has $ in its FOLLOW set
-        self.follow_sets['S'].add('$')
-        
-        # Compute FOLLOW sets
-        changed = True
-        while changed:
-            changed = False
-            for nt, prods in self.productions.items():
-                for prod in prods:
-                    if len(prod) == 1 and prod[0] == 'e':  # Skip epsilon productions
-                        continue
-                    
-                    # Process each symbol in the production
-                    for i, symbol in enumerate(prod):
-                        if symbol in self.nonterminals:  # Only interested in nonterminals
-                            # Compute FIRST set of the rest of the production
-                            beta = prod[i+1:] if i < len(prod) - 1 else []
-                            if not beta:
-                                first_beta = {'e'}
-                            else:
-                                first_beta = self.first_of_string(beta)
-                            
-                            # Add all non-epsilon symbols from FIRST(beta) to FOLLOW(symbol)
-                            for s in first_beta:
-                                if s != 'e' and s not in self.follow_sets[symbol]:
-                                    self.follow_sets[symbol].add(s)
-                                    changed = True
-                            
-                            # If epsilon is in FIRST(beta), add all of FOLLOW(nt) to FOLLOW(symbol)
-                            if 'e' in first_beta:
-                                for s in self.follow_sets[nt]:
-                                    if s not in self.follow_sets[symbol]:
-                                        self.follow_sets[symbol].add(s)
-                                        changed = True
-    
-    def check_ll1(self):
-        """Check if grammar is LL(1)"""
-        
-        # Create parsing table
-        table = {}
-        for nt in self.nonterminals:
-            table[nt] = {}
-        
-        # Try to fill the parsing table without conflicts
-        for nt, prods in self.productions.items():
-            for i, prod in enumerate(prods):
-                first_prod = self.first_of_string(prod)
-                
-                # For each terminal in FIRST(prod)
-                for terminal in first_prod - {'e'}:
-                    if terminal in table[nt]:
-                        # Conflict detected
-                        return False
-                    table[nt][terminal] = i
-                
-                # If epsilon is in FIRST(prod), add entries for terminals in FOLLOW(nt)
-                if 'e' in first_prod:
-                    for terminal in self.follow_sets[nt]:
-                        if terminal in table[nt]:
-                            # Conflict detected
-                            return False
-                        table[nt][terminal] = i
-        
-        return True
-    
-    def parse_ll1(self, input_string):
-        """Parse a string using LL(1) algorithm"""
-        
-        # Create parsing table
-        table = {}
-        for nt in self.nonterminals:
-            table[nt] = {}
-        
-        # Fill the parsing table
-        for nt, prods in self.productions.items():
-            for i, prod in enumerate(prods):
-                first_prod = self.first_of_string(prod)
-                
-                # For each terminal in FIRST(prod)
-                for terminal in first_prod - {'e'}:
-                    table[nt][terminal] = (i, prod)
-                
-                # If epsilon is in FIRST(prod), add entries for terminals in FOLLOW(nt)
-                if 'e' in first_prod:
-                    for terminal in self.follow_sets[nt]:
-                        table[nt][terminal] = (i, prod)
-        
-        # Add end marker if not present
-        if input_string and input_string[-1] != '$':
-            input_string = input_string + '$'
-        elif not input_string:
-            input_string = '$'
-        
-        # Initialize stack with end marker and start symbol
-        stack = ['$', 'S']
-        position = 0
-        
-        # Start parsing
-        while stack:
-            top = stack[-1]
-            
-            # Get current input symbol
-            current = input_string[position] if position < len(input_string) else '$'
-            
-            # If top is a terminal or $
-            if top not in self.nonterminals:
-                if top == current:
-                    stack.pop()
-                    position += 1
-                    if top == '$':
-                        return position == len(input_string)
-                else:
-                    return False  # Mismatch
-            
-            # Top is a nonterminal
-            elif current in table[top]:
-                prod_idx, prod = table[top][current]
-                stack.pop()
-                
-                # Push production in reverse order
-                if not (len(prod) == 1 and prod[0] == 'e'):  # Skip epsilon
-                    for symbol in reversed(prod):
-                        stack.append(symbol)
-            else:
-                return False  # No production found
-        
-        return position == len(input_string)
-    
-    def check_slr1(self):
-        """Check if grammar is SLR(1)"""
-        
-        try:
-            # Get augmented grammar
-            augmented_prods = self.productions.copy()
-            augmented_prods["S'"] = [['S']]
-            
-            # Get canonical collection of LR(0) items
-            items = []
-            goto = {}
-            
-            # Initialize with the closure of {S' -> .S}
-            initial_item = ("S'", 0, 0)
-            initial_state = self._closure({initial_item}, augmented_prods, set(self.nonterminals) | {"S'"})
-            items.append(initial_state)
-            
-            # Build the canonical collection
-            i = 0
-            while i < len(items):
-                state = items[i]
-                
-                # Find symbols after the dot in this state
-                symbols = set()
-                for nt, prod_idx, dot_pos in state:
-                    if dot_pos < len(augmented_prods[nt][prod_idx]):
-                        symbol = augmented_prods[nt][prod_idx][dot_pos]
-                        if not (symbol == 'e'):  # Skip epsilon
-                            symbols.add(symbol)
-                
-                # Process each symbol
-                for symbol in symbols:
-                    # Get the next state using GOTO
-                    next_state = set()
-                    for nt, prod_idx, dot_pos in state:
-                        if (dot_pos < len(augmented_prods[nt][prod_idx]) and 
-                            augmented_prods[nt][prod_idx][dot_pos] == symbol):
-                            next_state.add((nt, prod_idx, dot_pos + 1))
-                    
-                    # Get closure of the next state
-                    next_state = self._closure(next_state, augmented_prods, set(self.nonterminals) | {"S'"})
-                    
-                    # Add next_state to items if it's new
-                    if next_state:
-                        if next_state not in items:
-                            items.append(next_state)
-                            goto[(i, symbol)] = len(items) - 1
-                        else:
-                            goto[(i, symbol)] = items.index(next_state)
-                
-                i += 1
-            
-            # Create parsing table
-            action = {}
-            for i in range(len(items)):
-                action[i] = {}
-            
-            # Set up shift and goto actions
-            for (state_idx, symbol), next_state in goto.items():
-                if symbol in self.terminals:
-                    action[state_idx][symbol] = ('shift', next_state)
-            
-            # Set up reduce actions
-            for i, state in enumerate(items):
-                for nt, prod_idx, dot_pos in state:
-                    # If the item is [A -> α.] (dot at the end), add reduce action
-                    if nt != "S'" and dot_pos == len(augmented_prods[nt][prod_idx]):
-                        for terminal in self.follow_sets[nt]:
-                            # Check for conflicts
-                            if terminal in action[i]:
-                                return False  # Conflict detected
-                            action[i][terminal] = ('reduce', (nt, prod_idx))
-                    
-                    # If the item is [S' -> S.], add accept action
-                    if nt == "S'" and dot_pos == 1:
-                        if '$' in action[i]:
-                            return False  # Conflict
-                        action[i]['$'] = ('accept', None)
-            
-            return True
-            
-        except:
-            return False
-    
-    def _closure(self, items, augmented_prods, all_nonterminals):
-        """Compute closure of a set of LR(0) items"""
-        result = set(items)
-        
-        changed = True
-        while changed:
-            changed = False
-            new_items = set()
-            
-            for nt, prod_idx, dot_pos in result:
-                # If dot is before a nonterminal
-                if dot_pos < len(augmented_prods[nt][prod_idx]):
-                    next_symbol = augmented_prods[nt][prod_idx][dot_pos]
-                    if next_symbol in all_nonterminals:
-                        # Add productions of this nonterminal to the closure
-                        if next_symbol in augmented_prods:
-                            for i, prod in enumerate(augmented_prods[next_symbol]):
-                                new_item = (next_symbol, i, 0)
-                                if new_item not in result:
-                                    new_items.add(new_item)
-                                    changed = True
-            
-            result.update(new_items)
-        
-        return result
-    
-    def parse_slr1(self, input_string):
-        """Parse a string using SLR(1) algorithm"""
-        try:
-            # Get augmented grammar
-            augmented_prods = self.productions.copy()
-            augmented_prods["S'"] = [['S']]
-            
-            # Get canonical collection
-            items = []
-            goto = {}
-            
-            # Initialize with the closure of {S' -> .S}
-            initial_item = ("S'", 0, 0)
-            initial_state = self._closure({initial_item}, augmented_prods, set(self.nonterminals) | {"S'"})
-            items.append(initial_state)
-            
-            # Build the canonical collection
-            i = 0
-            while i < len(items):
-                state = items[i]
-                
-                # Find symbols after the dot in this state
-                symbols = set()
-                for nt, prod_idx, dot_pos in state:
-                    if dot_pos < len(augmented_prods[nt][prod_idx]):
-                        symbol = augmented_prods[nt][prod_idx][dot_pos]
-                        if not (symbol == 'e'):
-                            symbols.add(symbol)
-                
-                # Process each symbol
-                for symbol in symbols:
-                    # Get the next state using GOTO
-                    next_state = set()
-                    for nt, prod_idx, dot_pos in state:
-                        if (dot_pos < len(augmented_prods[nt][prod_idx]) and 
-                            augmented_prods[nt][prod_idx][dot_pos] == symbol):
-                            next_state.add((nt, prod_idx, dot_pos + 1))
-                    
-                    # Get closure of the next state
-                    next_state = self._closure(next_state, augmented_prods, set(self.nonterminals) | {"S'"})
-                    
-                    # Add next_state to items if it's new
-                    if next_state:
-                        if next_state not in items:
-                            items.append(next_state)
-                            goto[(i, symbol)] = len(items) - 1
-                        else:
-                            goto[(i, symbol)] = items.index(next_state)
-                
-                i += 1
-            
-            # Create parsing table
-            action = {}
-            goto_table = {}
-            for i in range(len(items)):
-                action[i] = {}
-                goto_table[i] = {}
-            
-            # Set up shift and goto actions
-            for (state_idx, symbol), next_state in goto.items():
-                if symbol in self.terminals:
-                    action[state_idx][symbol] = ('shift', next_state)
-                else:
-                    goto_table[state_idx][symbol] = next_state
-            
-            # Set up reduce actions
-            for i, state in enumerate(items):
-                for nt, prod_idx, dot_pos in state:
-                    # If the item is [A -> α.] (dot at the end), add reduce action
-                    if nt != "S'" and dot_pos == len(augmented_prods[nt][prod_idx]):
-                        for terminal in self.follow_sets[nt]:
-                            action[i][terminal] = ('reduce', (nt, prod_idx))
-                    
-                    # If the item is [S' -> S.], add accept action
-                    if nt == "S'" and dot_pos == 1:
-                        action[i]['$'] = ('accept', None)
-            
-            # Add end marker if not present
-            if input_string and input_string[-1] != '$':
-                input_string = input_string + '$'
-            elif not input_string:
-                input_string = '$'
-            
-            # Parse input
-            stack = [0]  # Start with state 0
-            position = 0
-            
-            while True:
-                current_state = stack[-1]
-                current_symbol = input_string[position] if position < len(input_string) else '$'
-                
-                if current_symbol not in action[current_state]:
-                    return False
-                
-                act, value = action[current_state][current_symbol]
-                
-                if act == 'shift':
-                    stack.append(current_symbol)
-                    stack.append(value)
-                    position += 1
-                elif act == 'reduce':
-                    nt, prod_idx = value
-                    prod = augmented_prods[nt][prod_idx]
-                    
-                    # Pop 2 * len(prod) items from stack (symbol and state for each symbol)
-                    if not (len(prod) == 1 and prod[0] == 'e'):
-                        stack = stack[:-2*len(prod)]
-                    
-                    # Get current state after popping
-                    current_state = stack[-1]
-                    
-                    # Push nonterminal and goto state
-                    if nt not in goto_table[current_state]:
-                        return False
-                    stack.append(nt)
-                    stack.append(goto_table[current_state][nt])
-                elif act == 'accept':
-                    return True
-                else:
-                    return False
-            
-        except Exception as e:
-            return False
-
-
-def parse_grammar():
-    """Parse grammar from user input"""
-    
-    # Read number of nonterminals
-    n = int(input())
-    
-    productions = {}
-    
-    # Read productions
-    for _ in range(n):
-        line = input().strip()
-        parts = line.split(' -> ')
-        nt = parts[0]
-        rules = parts[1].split()
-        
-        if nt not in productions:
-            productions[nt] = []
-        
-        for rule in rules:
-            productions[nt].append(list(rule))
-    
-    return Grammar(productions)
-
-
-def parse_strings(grammar, parser_type):
-    """Parse strings using the specified parser"""
-    
-    while True:
-        try:
-            string = input()
-            if not string:
-                break
-            
-            if parser_type == 'LL1':
-                result = grammar.parse_ll1(string)
-            else:  # SLR1
-                result = grammar.parse_slr1(string)
-            
-            print("yes" if result else "no")
-        except EOFError:
-            break
-
-
-def main():
-    """Main function"""
-    
-    grammar = parse_grammar()
-    
-    # Check if grammar is LL(1) and/or SLR(1)
-    is_ll1 = grammar.check_ll1()
-    is_slr1 = grammar.check_slr1()
-    
-    if is_ll1 and is_slr1:
-        print("Select a parser (T: for LL(1), B: for SLR(1), Q: quit):")
-        
-        while True:
-            try:
-                choice = input().strip().upper()
-                if choice == 'T':
-                    parse_strings(grammar, 'LL1')
-                    print("Select a parser (T: for LL(1), B: for SLR(1), Q: quit):")
-                elif choice == 'B':
-                    parse_strings(grammar, 'SLR1')
-                    print("Select a parser (T: for LL(1), B: for SLR(1), Q: quit):")
-                elif choice == 'Q':
-                    break
-            except EOFError:
-                break
-    elif is_ll1:
-        print("Grammar is LL(1).")
-        parse_strings(grammar, 'LL1')
-    elif is_slr1:
-        print("Grammar is SLR(1).")
-        parse_strings(grammar, 'SLR1')
-    else:
-        print("Grammar is neither LL(1) nor SLR(1).")
-
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+"""
+Proyecto LFC - Gramáticas LL(1) y SLR(1)
+Integrantes: Mariana Sanchez, Sebastian Cañon
+"""
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+
+def _digraph(nodes, relation, initial):
+    """Solve F(x) = initial[x] | OR{F(y) | y in relation[x]} for every node.
+    
+    The sets are integer bitsets (see Grammar.terminal_bits). This is the
+    DeRemer-Pennello digraph algorithm: a Tarjan-style traversal that gives
+    each strongly connected component one shared value, so every node is
+    visited once instead of iterating to a fixed point.
+    """
+    done = len(nodes) + 1
+    depth = {}
+    result = {}
+    stack = []
+    
+    for root in nodes:
+        if root in depth:
+            continue
+        
+        stack.append(root)
+        depth[root] = len(stack)
+        result[root] = initial.get(root, 0)
+        frames = [(root, iter(relation.get(root, ())), len(stack))]
+        
+        while frames:
+            x, successors, d = frames[-1]
+            
+            # Descend into the first unvisited successor
+            descended = False
+            for y in successors:
+                if y not in depth:
+                    stack.append(y)
+                    depth[y] = len(stack)
+                    result[y] = initial.get(y, 0)
+                    frames.append((y, iter(relation.get(y, ())), len(stack)))
+                    descended = True
+                    break
+                depth[x] = min(depth[x], depth[y])
+                result[x] |= result[y]
+            if descended:
+                continue
+            
+            # x is finished: if it is the root of its component, collapse it
+            frames.pop()
+            if depth[x] == d:
+                while True:
+                    top = stack.pop()
+                    depth[top] = done
+                    result[top] = result[x]
+                    if top == x:
+                        break
+            
+            # Propagate the finished node to its caller
+            if frames:
+                parent = frames[-1][0]
+                depth[parent] = min(depth[parent], depth[x])
+                result[parent] |= result[x]
+    
+    return result
+
+
+class _TerminalIds(dict):
+    """Terminal ids that map every unknown character to one extra column"""
+    
+    def __init__(self, ids, unknown):
+        super().__init__(ids)
+        self.unknown = unknown
+    
+    def __missing__(self, symbol):
+        return self.unknown
+
+
+class GrammarStats:
+    """Wall times and counters collected while a Grammar is analysed and used.
+    
+    Enabled by passing Grammar(..., stats=GrammarStats()); without it nothing
+    is measured and the parsers run their usual drivers. ``phases`` holds the
+    seconds spent in 'first', 'follow', 'll1_table', 'lr0_collection' and
+    'slr1_table'. ``counters`` holds:
+    
+        first_steps, follow_steps     worklist pops plus nodes and edges walked
+                                      by the digraph traversals, which stand
+                                      in for fixed-point iterations
+        closure_calls, closure_items  LR(0) closures computed and the items
+                                      they added to their kernels
+        lr0_states                    states of the LR(0) collection
+        ll1_parses, ll1_predicts, ll1_matches, ll1_max_stack
+        slr1_parses, slr1_shifts, slr1_reduces, slr1_max_stack
+    """
+    
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+    
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Add the wall time of a with block to a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+    
+    def count(self, name, n=1):
+        """Add n to a counter"""
+        self.counters[name] = self.counters.get(name, 0) + n
+    
+    def maximum(self, name, value):
+        """Raise a counter to value if it is lower"""
+        if value > self.counters.get(name, 0):
+            self.counters[name] = value
+    
+    def summary(self):
+        """Return the phases, the counters and the mean steps per parse as a dict"""
+        per_parse = {}
+        for kind, steps in (('ll1', ('predicts', 'matches')), ('slr1', ('shifts', 'reduces'))):
+            parses = self.counters.get(kind + '_parses')
+            if parses:
+                for step in steps:
+                    name = '%s_%s' % (kind, step)
+                    per_parse[name] = self.counters.get(name, 0) / parses
+        return {'phases': dict(self.phases), 'counters': dict(self.counters),
+                'per_parse': per_parse}
+
+
+def _phase(stats, name):
+    """Time a with block into stats, or do nothing when stats is None"""
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.phase(name)
+
+
+class Tokenizer:
+    """Scanner turning text into the terminal names of a grammar.
+    
+    All token definitions are compiled once into a single master regular
+    expression, tried in this order: ignored patterns (whitespace by
+    default), named token patterns in declaration order, then literal
+    terminals longest first. A pattern match whose text is also a literal
+    terminal is reported as that literal, so keywords win over identifiers
+    of the same spelling while longer identifiers are still recognized.
+    A character that starts no token yields None, which no table accepts,
+    and ends the scan.
+    """
+    
+    def __init__(self, literals, patterns=(), ignore=(r'\s+',)):
+        self.literals = frozenset(literals)
+        self.patterns = tuple(patterns)
+        self.ignore = tuple(ignore)
+        
+        # An empty match would win the alternation and stop every scan
+        for name, regex in self.patterns + tuple(('ignored text', regex) for regex in self.ignore):
+            if re.fullmatch(regex, ''):
+                raise ValueError("token pattern %s matches the empty string: %s" % (name, regex))
+        
+        alternatives = []
+        if self.ignore:
+            alternatives.append('(?P<_skip>%s)' % '|'.join('(?:%s)' % regex for regex in self.ignore))
+        self._pattern_names = {}
+        for i, (name, regex) in enumerate(self.patterns):
+            group = '_p%d' % i
+            self._pattern_names[group] = name
+            alternatives.append('(?P<%s>%s)' % (group, regex))
+        if self.literals:
+            literals = sorted(self.literals, key=lambda literal: (-len(literal), literal))
+            alternatives.append('(?P<_literal>%s)' % '|'.join(re.escape(literal) for literal in literals))
+        self._master = re.compile('|'.join(alternatives) or '(?!)')
+        
+        # Whether a regex might match text that a partial match fails on
+        self._open_ended = bool(self.patterns) or any(regex != r'\s+' for regex in self.ignore)
+    
+    def __reduce__(self):
+        return Tokenizer, (self.literals, self.patterns, self.ignore)
+    
+    def _matches(self, text, pos, end):
+        """Yield (token, end of match) from pos, stopping at the first error"""
+        match = self._master.match
+        literals = self.literals
+        pattern_names = self._pattern_names
+        while pos < end:
+            found = match(text, pos, end)
+            if found is None or found.end() == pos:
+                yield None, pos
+                return
+            pos = found.end()
+            kind = found.lastgroup
+            if kind == '_skip':
+                continue
+            token = found.group()
+            if kind != '_literal' and token not in literals:
+                token = pattern_names[kind]
+            yield token, pos
+    
+    def scan(self, text):
+        """Yield the terminal names of the tokens in text"""
+        for token, _ in self._matches(text, 0, len(text)):
+            yield token
+    
+    def stream(self, chunks, max_token=1 << 10):
+        """Yield the tokens of text arriving as an iterable of chunks.
+        
+        The last token of each chunk is held back until more text arrives,
+        since it might continue in the next chunk. So is text that starts no
+        token while it may still be the start of a longer one; the None of
+        a lexical error comes as soon as it cannot: when that text is no
+        prefix of a literal and there are only literals, or when it grows
+        past ``max_token`` characters.
+        """
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            consumed = 0
+            for token, end in self._matches(buffer, 0, len(buffer)):
+                if token is None:
+                    tail = buffer[end:]
+                    if len(tail) > max_token or not (self._open_ended or any(
+                            literal.startswith(tail) for literal in self.literals)):
+                        yield None
+                        return
+                    break
+                if end == len(buffer):
+                    break
+                yield token
+                consumed = end
+            buffer = buffer[consumed:]
+        yield from self.scan(buffer)
+
+
+def _encode(terminal_ids, input_string, tokenizer=None):
+    """Translate an input string into terminal ids, ending with the id of $.
+    
+    The input may also be a sequence of terminal names; a string is
+    split into tokens by the tokenizer when there is one.
+    """
+    if tokenizer is not None and isinstance(input_string, str):
+        input_string = tokenizer.scan(input_string)
+    codes = list(map(terminal_ids.__getitem__, input_string))
+    
+    # Add end marker if not present
+    if not codes or codes[-1] != 0:
+        codes.append(0)
+    return codes
+
+
+class SymbolTable:
+    """Dense integer ids for the terminals and nonterminals of a Grammar"""
+    
+    def __init__(self, grammar):
+        # Every symbol the LL(1) driver may have to match, plus $
+        terminals = set(grammar.terminals)
+        for prods in grammar.productions.values():
+            for prod in prods:
+                if not (len(prod) == 1 and prod[0] == 'e'):
+                    terminals.update(symbol for symbol in prod
+                                     if symbol not in grammar.nonterminals)
+        terminals.discard('$')
+        
+        # $ is always terminal 0; the column after the last terminal stands
+        # for any character outside the grammar, and its cells stay empty
+        self.terminals = ['$'] + sorted(terminals)
+        self.unknown = len(self.terminals)
+        self.terminal_ids = _TerminalIds(
+            {t: i for i, t in enumerate(self.terminals)}, self.unknown)
+        
+        self.nonterminals = sorted(grammar.nonterminals)
+        self.nonterminal_ids = {nt: i for i, nt in enumerate(self.nonterminals)}
+        self.tokenizer = grammar.tokenizer
+    
+    def encode(self, input_string):
+        """Translate an input string into terminal ids, ending with the id of $"""
+        return _encode(self.terminal_ids, input_string, self.tokenizer)
+
+
+class LL1Table:
+    """Compiled LL(1) predictive parsing table for a Grammar"""
+    
+    def __init__(self, grammar):
+        self.nonterminals = set(grammar.nonterminals)
+        
+        # FIRST(prod) bitset for every production, keyed by (nonterminal, index)
+        self.first_of_prod = {}
+        
+        # table[nt][terminal] = (prod_idx, prod); later productions win on conflicts
+        self.table = {}
+        for nt in grammar.nonterminals:
+            self.table[nt] = {}
+        
+        # Every cell that was filled more than once: (nt, terminal, previous idx, new idx)
+        self.conflicts = []
+        
+        for nt, prods in grammar.productions.items():
+            # Bitset of the cells of this row filled so far
+            filled = 0
+            for i, prod in enumerate(prods):
+                first_prod = grammar.suffix_first[(nt, i)][0]
+                self.first_of_prod[(nt, i)] = first_prod
+                
+                # For each terminal in FIRST(prod)
+                filled = self._add_all(grammar, nt, first_prod & ~1, filled, i, prod)
+                
+                # If epsilon is in FIRST(prod), add entries for terminals in FOLLOW(nt)
+                if first_prod & 1:
+                    filled = self._add_all(grammar, nt, grammar.follow_bits[nt], filled, i, prod)
+        
+        self._compile(grammar.compile_symbols(), grammar.start)
+    
+    def _add_all(self, grammar, nt, terminals, filled, prod_idx, prod):
+        """Fill the cells of a bitset of terminals and return the new filled bitset.
+        
+        Cells are only checked one by one for conflicts when the bitsets overlap.
+        """
+        if terminals & filled:
+            for terminal in grammar.terminal_list(terminals):
+                self._add(nt, terminal, prod_idx, prod)
+        else:
+            row = self.table[nt]
+            cell = (prod_idx, prod)
+            for terminal in grammar.terminal_list(terminals):
+                row[terminal] = cell
+        return filled | terminals
+    
+    def _add(self, nt, terminal, prod_idx, prod):
+        """Fill one table cell, recording a conflict if it was already set"""
+        row = self.table[nt]
+        if terminal in row:
+            self.conflicts.append((nt, terminal, row[terminal][0], prod_idx))
+        row[terminal] = (prod_idx, prod)
+    
+    def is_ll1(self):
+        """The grammar is LL(1) when no cell of the table has two entries"""
+        return not self.conflicts
+    
+    def _compile(self, symbols, start):
+        """Flatten the table into an integer array used by the driver.
+        
+        Terminals are encoded as their id and nonterminals as ~(row offset),
+        so the driver tells them apart by sign and finds the predicted rule
+        at predict[~symbol + terminal]. Rule 0 marks an empty cell; the other
+        rules hold their right-hand side already reversed for pushing.
+        """
+        self.symbols = symbols
+        self.terminal_ids = symbols.terminal_ids
+        self.tokenizer = symbols.tokenizer
+        width = symbols.unknown + 1
+        
+        def encode_symbol(symbol):
+            if symbol in symbols.nonterminal_ids:
+                return ~(symbols.nonterminal_ids[symbol] * width)
+            return symbols.terminal_ids[symbol]
+        
+        self.width = width
+        self.start = encode_symbol(start)
+        self.rules = [()]
+        self.predict = array('i', [0]) * (len(symbols.nonterminals) * width)
+        
+        # Production index of every rule, for building parse trees, and the
+        # tree rules parse_tree derives from them on first use
+        self.rule_productions = [-1]
+        self.tree_rules = None
+        
+        rule_ids = {}
+        for nt, row in self.table.items():
+            base = symbols.nonterminal_ids[nt] * width
+            for terminal, (prod_idx, prod) in row.items():
+                if (nt, prod_idx) not in rule_ids:
+                    rule_ids[(nt, prod_idx)] = len(self.rules)
+                    self.rule_productions.append(prod_idx)
+                    if len(prod) == 1 and prod[0] == 'e':
+                        self.rules.append(())
+                    else:
+                        self.rules.append(tuple(encode_symbol(symbol)
+                                                for symbol in reversed(prod)))
+                self.predict[base + symbols.terminal_ids[terminal]] = rule_ids[(nt, prod_idx)]
+    
+    def parse(self, input_string):
+        """Parse a string with the predictive parsing algorithm"""
+        return _ll1_accepts(self.predict, self.rules, self.start,
+                            self.symbols.encode(input_string))
+    
+    def trace(self, input_string, stats):
+        """Parse like parse(), counting the parser steps into a GrammarStats"""
+        return _ll1_trace(self.predict, self.rules, self.start,
+                          self.symbols.encode(input_string), stats)
+    
+    def parse_batch(self, strings):
+        """Parse many strings, sharing the work of their common prefixes"""
+        return _ll1_accepts_shared(self.predict, self.rules, self.start,
+                                   [self.symbols.encode(string) for string in strings])
+    
+    def parse_lockstep(self, strings):
+        """Parse many strings at once with NumPy, or one by one without it"""
+        numpy = _import_numpy()
+        if numpy is None or not strings:
+            return [self.parse(string) for string in strings]
+        codes, lengths = _code_matrix(numpy, self.terminal_ids, strings, self.tokenizer)
+        return _ll1_lockstep(numpy, self.predict, self.rules, self.start, codes, lengths)
+    
+    def _tree_symbol(self, code):
+        # Tree symbol ids: terminal ids, then unknown + nonterminal id
+        return code if code >= 0 else self.symbols.unknown + ~code // self.width
+    
+    def parse_tree(self, input_string):
+        """Return the ParseTree of an accepted string, or None if it is rejected"""
+        symbols = self.symbols
+        
+        # For every rule: its production, its children's symbols in source
+        # order and as many -1 cells
+        if self.tree_rules is None:
+            tree_symbol = self._tree_symbol
+            self.tree_rules = [
+                (prod_idx, array('i', [tree_symbol(code) for code in reversed(rhs)]),
+                 array('i', [-1]) * len(rhs))
+                for prod_idx, rhs in zip(self.rule_productions, self.rules)]
+        
+        tree = ParseTree(symbols.terminals + symbols.nonterminals)
+        root = tree.add(self._tree_symbol(self.start))
+        if not _ll1_tree(self.predict, self.rules, self.tree_rules, self.start,
+                         symbols.encode(input_string), tree, root):
+            return None
+        return tree
+    
+    def pack(self):
+        """Return (kind, header, table bytes) for rebuilding the driver elsewhere"""
+        return 'LL1', (self.symbols.terminals, self.start, self.rules), self.predict.tobytes()
+
+
+class SLRAutomaton:
+    """Canonical LR(0) collection and SLR(1) ACTION/GOTO tables for a Grammar"""
+    
+    def __init__(self, grammar):
+        # Get augmented grammar
+        augmented_prods = grammar.productions.copy()
+        augmented_prods["S'"] = [[grammar.start]]
+        self.augmented_prods = augmented_prods
+        self.stats = grammar.stats
+        
+        self._compute_nonterminal_closures()
+        
+        # Create parsing table
+        self.action = []
+        self.goto_table = []
+        
+        # Every cell that was filled more than once: (state, terminal, previous, new)
+        self.conflicts = []
+        
+        with _phase(self.stats, 'lr0_collection'):
+            reductions = self._build_collection(grammar)
+        with _phase(self.stats, 'slr1_table'):
+            self._add_reductions(grammar, reductions)
+            self._compile(grammar.compile_symbols())
+    
+    def _build_collection(self, grammar):
+        """Build the canonical collection of LR(0) items with its shift and
+        goto transitions.
+        
+        Returns the complete items [A -> α.] of every state, as the
+        (nonterminal, production index) pairs to reduce.
+        """
+        
+        # States only keep their kernel; the closure is expanded while the
+        # state's rows are built
+        self.kernels = []
+        self._state_index = {}
+        reductions = []
+        
+        # Initialize with the kernel {S' -> .S}
+        self._new_state(frozenset([("S'", 0, 0)]))
+        
+        # Build the canonical collection
+        i = 0
+        while i < len(self.kernels):
+            reductions.append(self._expand(grammar, i))
+            i += 1
+        
+        if self.stats is not None:
+            self.stats.count('lr0_states', len(self.kernels))
+        return reductions
+    
+    def _new_state(self, kernel):
+        """Return the index of the state with this kernel, adding it if it is new"""
+        state_idx = self._state_index.get(kernel)
+        if state_idx is None:
+            state_idx = len(self.kernels)
+            self._state_index[kernel] = state_idx
+            self.kernels.append(kernel)
+            self.action.append({})
+            self.goto_table.append({})
+        return state_idx
+    
+    def _expand(self, grammar, i):
+        """Add the shift and goto transitions of a state, creating their targets.
+        
+        Returns the complete items of the state, as _build_collection does.
+        """
+        augmented_prods = self.augmented_prods
+        state = self._closure(self.kernels[i])
+        
+        # Group the kernels of every GOTO(state, X) by the symbol after the dot
+        transitions = {}
+        for nt, prod_idx, dot_pos in state:
+            prod = augmented_prods[nt][prod_idx]
+            if dot_pos < len(prod):
+                symbol = prod[dot_pos]
+                if not (symbol == 'e'):  # Skip epsilon
+                    if symbol not in transitions:
+                        transitions[symbol] = set()
+                    transitions[symbol].add((nt, prod_idx, dot_pos + 1))
+        
+        # Set up shift and goto actions
+        for symbol, kernel in transitions.items():
+            next_idx = self._new_state(frozenset(kernel))
+            if symbol in grammar.terminals:
+                self._add_action(i, symbol, ('shift', next_idx))
+            else:
+                self.goto_table[i][symbol] = next_idx
+        
+        # Items with the dot at the end, including [S' -> S.]
+        return sorted((nt, prod_idx) for nt, prod_idx, dot_pos in state
+                      if dot_pos == len(augmented_prods[nt][prod_idx]))
+    
+    def _add_reductions(self, grammar, reductions):
+        """Add the reduce and accept actions of every state"""
+        for i, complete in enumerate(reductions):
+            self._add_state_reductions(grammar, i, complete)
+    
+    def _add_state_reductions(self, grammar, i, complete):
+        """Add the reduce and accept actions of one state"""
+        row = self.action[i]
+        
+        # Bitset of the filled ACTION cells: cells are only checked one
+        # by one for conflicts when a FOLLOW set overlaps it
+        filled = grammar.terminal_mask(row)
+        
+        # If the item is [A -> α.] (dot at the end), add reduce action
+        for nt, prod_idx in complete:
+            if nt != "S'":
+                follow = grammar.follow_bits[nt]
+                action = ('reduce', (nt, prod_idx))
+                if follow & filled:
+                    for terminal in grammar.terminal_list(follow):
+                        self._add_action(i, terminal, action)
+                else:
+                    for terminal in grammar.terminal_list(follow):
+                        row[terminal] = action
+                filled |= follow
+        
+        # If the item is [S' -> S.], add accept action
+        if ("S'", 0) in complete:
+            self._add_action(i, '$', ('accept', None))
+    
+    def _compute_nonterminal_closures(self):
+        """Prepare the "A starts with B" relation used by _nonterminal_closure"""
+        augmented_prods = self.augmented_prods
+        
+        # starts_with[A] = nonterminals B with a production A -> Bβ
+        self.starts_with = {}
+        for nt, prods in augmented_prods.items():
+            self.starts_with[nt] = {prod[0] for prod in prods
+                                    if prod and prod[0] in augmented_prods}
+        
+        # Filled on demand: long chains would make computing them all quadratic
+        self.nonterminal_closures = {}
+    
+    def _nonterminal_closure(self, nt):
+        """Return closure({A -> .α for every A-production}), computed once per A"""
+        closure = self.nonterminal_closures.get(nt)
+        if closure is None:
+            # Reflexive-transitive closure of "A starts with B" with a worklist
+            reached = {nt}
+            worklist = [nt]
+            while worklist:
+                for other in self.starts_with[worklist.pop()]:
+                    if other not in reached:
+                        reached.add(other)
+                        worklist.append(other)
+            
+            closure = frozenset(
+                (other, i, 0)
+                for other in reached
+                for i in range(len(self.augmented_prods[other]))
+            )
+            self.nonterminal_closures[nt] = closure
+        return closure
+    
+    def _closure(self, kernel):
+        """Compute closure of a kernel of LR(0) items"""
+        result = set(kernel)
+        for nt, prod_idx, dot_pos in kernel:
+            prod = self.augmented_prods[nt][prod_idx]
+            
+            # If dot is before a nonterminal, add its precomputed closure
+            if dot_pos < len(prod) and prod[dot_pos] in self.starts_with:
+                result |= self._nonterminal_closure(prod[dot_pos])
+        
+        if self.stats is not None:
+            self.stats.count('closure_calls')
+            self.stats.count('closure_items', len(result) - len(kernel))
+        return result
+    
+    def items(self, state_idx):
+        """Return the full LR(0) item set of a state"""
+        return self._closure(self.kernels[state_idx])
+    
+    def _add_action(self, state_idx, terminal, action):
+        """Fill one ACTION cell, recording a conflict if it was already set"""
+        row = self.action[state_idx]
+        if terminal in row:
+            self.conflicts.append((state_idx, terminal, row[terminal], action))
+        row[terminal] = action
+    
+    def is_slr1(self):
+        """The grammar is SLR(1) when no ACTION cell has two entries"""
+        return not self.conflicts
+    
+    def _compile(self, symbols):
+        """Flatten ACTION and GOTO into one integer array used by the driver.
+        
+        Each state owns a row of ``width`` cells: one per terminal id (plus
+        the unknown column) followed by one per nonterminal. States are
+        referred to by their row offset. An ACTION cell holds 0 for error,
+        offset + 1 for a shift and ~rule for a reduction, where rule 0 is
+        S' -> S and means accept. A GOTO cell holds the target offset, which
+        is never 0 because no transition enters the initial state.
+        """
+        self._compile_rules(symbols)
+        self.action_goto = array('i', [0]) * (len(self.kernels) * self.width)
+        for state_idx in range(len(self.kernels)):
+            self._compile_row(state_idx)
+    
+    def _compile_rules(self, symbols):
+        """Number the rules and set up the row layout of _compile"""
+        self.symbols = symbols
+        self.terminal_ids = symbols.terminal_ids
+        self.tokenizer = symbols.tokenizer
+        n_columns = symbols.unknown + 1
+        self.n_columns = n_columns
+        self.width = n_columns + len(symbols.nonterminals)
+        
+        # Rule numbering, with the right-hand side length and GOTO column
+        self.rules = [("S'", 0)]
+        for nt, prods in self.augmented_prods.items():
+            if nt != "S'":
+                self.rules.extend((nt, i) for i in range(len(prods)))
+        self.rule_ids = {rule: i for i, rule in enumerate(self.rules)}
+        self.tree_rules = None  # Built by parse_tree on first use
+        
+        self.rhs_lengths = array('i')
+        self.goto_columns = array('i')
+        for nt, prod_idx in self.rules:
+            prod = self.augmented_prods[nt][prod_idx]
+            epsilon = len(prod) == 1 and prod[0] == 'e'
+            self.rhs_lengths.append(0 if epsilon else len(prod))
+            self.goto_columns.append(n_columns + symbols.nonterminal_ids.get(nt, 0))
+    
+    def _compile_row(self, state_idx):
+        """Write the ACTION and GOTO cells of one state into action_goto"""
+        symbols = self.symbols
+        width = self.width
+        base = state_idx * width
+        for terminal, (act, value) in self.action[state_idx].items():
+            if act == 'shift':
+                code = value * width + 1
+            elif act == 'reduce':
+                code = ~self.rule_ids[value]
+            else:  # accept
+                code = ~0
+            self.action_goto[base + symbols.terminal_ids[terminal]] = code
+        for nt, next_state in self.goto_table[state_idx].items():
+            self.action_goto[base + self.n_columns + symbols.nonterminal_ids[nt]] = next_state * width
+    
+    def parse(self, input_string):
+        """Parse a string with the shift-reduce algorithm"""
+        return _slr1_accepts(self.action_goto, self.rhs_lengths, self.goto_columns,
+                             self.symbols.encode(input_string))
+    
+    def trace(self, input_string, stats):
+        """Parse like parse(), counting the parser steps into a GrammarStats"""
+        return _slr1_trace(self.action_goto, self.rhs_lengths, self.goto_columns,
+                           self.symbols.encode(input_string), stats)
+    
+    def parse_batch(self, strings):
+        """Parse many strings, sharing the work of their common prefixes"""
+        return _slr1_accepts_shared(self.action_goto, self.rhs_lengths, self.goto_columns,
+                                    [self.symbols.encode(string) for string in strings])
+    
+    def parse_lockstep(self, strings):
+        """Parse many strings at once with NumPy, or one by one without it"""
+        numpy = _import_numpy()
+        if numpy is None or not strings:
+            return [self.parse(string) for string in strings]
+        codes, _ = _code_matrix(numpy, self.terminal_ids, strings, self.tokenizer)
+        return _slr1_lockstep(numpy, self.action_goto, self.rhs_lengths, self.goto_columns,
+                              codes)
+    
+    def parse_tree(self, input_string):
+        """Return the ParseTree of an accepted string, or None if it is rejected"""
+        symbols = self.symbols
+        
+        # Symbol and production of the node each rule creates
+        if self.tree_rules is None:
+            self.tree_rules = [(symbols.unknown + symbols.nonterminal_ids.get(nt, 0), prod_idx)
+                               for nt, prod_idx in self.rules]
+        
+        tree = ParseTree(symbols.terminals + symbols.nonterminals)
+        if not _slr1_tree(self.action_goto, self.rhs_lengths, self.goto_columns, self.tree_rules,
+                          symbols.encode(input_string), tree):
+            return None
+        return tree
+    
+    def pack(self):
+        """Return (kind, header, table bytes) for rebuilding the driver elsewhere"""
+        header = (self.symbols.terminals, self.rhs_lengths.tolist(), self.goto_columns.tolist())
+        return 'SLR1', header, self.action_goto.tobytes()
+
+
+class LazySLRAutomaton(SLRAutomaton):
+    """SLR(1) automaton whose states are built the first time a parse reaches them.
+    
+    Only the initial state exists at first; every parse builds the states,
+    ACTION/GOTO rows and conflicts it needs and keeps them for the next
+    ones. Conflicts are recorded and resolved as in SLRAutomaton, and with
+    ``check_conflicts`` every parse that enters a state with a conflict
+    raises ValueError, not only the one that built it. materialize() builds
+    the rest of the collection, which is_slr1(), trace(), parse_tree() and
+    pack() do first.
+    """
+    
+    def __init__(self, grammar, check_conflicts=False):
+        augmented_prods = grammar.productions.copy()
+        augmented_prods["S'"] = [[grammar.start]]
+        self.augmented_prods = augmented_prods
+        self.grammar = grammar
+        self.stats = grammar.stats
+        self.check_conflicts = check_conflicts
+        
+        self._compute_nonterminal_closures()
+        
+        self.action = []
+        self.goto_table = []
+        self.conflicts = []
+        self.kernels = []
+        self._state_index = {}
+        
+        # Whether each state has been built (1, or 2 if it has a conflict the
+        # parser must report), and how many are still waiting
+        self.built = bytearray()
+        self.pending = 0
+        
+        self._compile_rules(grammar.compile_symbols())
+        self.action_goto = array('i')
+        self._new_state(frozenset([("S'", 0, 0)]))
+    
+    def _new_state(self, kernel):
+        count = len(self.kernels)
+        state_idx = super()._new_state(kernel)
+        if state_idx == count:
+            # An empty row until the state is built
+            self.action_goto.extend(array('i', [0]) * self.width)
+            self.built.append(0)
+            self.pending += 1
+            if self.stats is not None:
+                self.stats.count('lr0_states')
+        return state_idx
+    
+    def _build(self, state_idx):
+        """Build one state: its closure, transitions, reductions and row"""
+        grammar = self.grammar
+        conflicts = len(self.conflicts)
+        with _phase(self.stats, 'lr0_collection'):
+            complete = self._expand(grammar, state_idx)
+        with _phase(self.stats, 'slr1_table'):
+            self._add_state_reductions(grammar, state_idx, complete)
+            self._compile_row(state_idx)
+        self.built[state_idx] = 2 if self.check_conflicts and len(self.conflicts) > conflicts else 1
+        self.pending -= 1
+    
+    def reach(self, offset):
+        """Build the state at a row offset for the parser if needed, and
+        raise ValueError if it has a conflict that must be reported"""
+        state_idx = offset // self.width
+        if not self.built[state_idx]:
+            self._build(state_idx)
+        if self.built[state_idx] == 2:
+            terminal = next(conflict[1] for conflict in self.conflicts
+                            if conflict[0] == state_idx)
+            raise ValueError("grammar is not SLR(1): state %d has a conflict on %r"
+                             % (state_idx, terminal))
+    
+    def materialize(self):
+        """Build every state not reached yet, completing the collection"""
+        state_idx = 0
+        while self.pending:
+            if not self.built[state_idx]:
+                self._build(state_idx)
+            state_idx += 1
+    
+    def is_slr1(self):
+        """The grammar is SLR(1) when no ACTION cell has two entries"""
+        self.materialize()
+        return not self.conflicts
+    
+    def parse(self, input_string):
+        """Parse a string, building the states it reaches"""
+        codes = self.symbols.encode(input_string)
+        if not self.pending and not (self.check_conflicts and self.conflicts):
+            return _slr1_accepts(self.action_goto, self.rhs_lengths, self.goto_columns, codes)
+        return _slr1_lazy_accepts(self, codes)
+    
+    def trace(self, input_string, stats):
+        """Parse like parse(), counting the parser steps, on the full automaton"""
+        self.materialize()
+        return super().trace(input_string, stats)
+    
+    def parse_tree(self, input_string):
+        """Return the ParseTree of an accepted string, on the full automaton"""
+        self.materialize()
+        return super().parse_tree(input_string)
+    
+    def parse_batch(self, strings):
+        """Parse many strings sharing their prefixes, on the full automaton"""
+        self.materialize()
+        return super().parse_batch(strings)
+    
+    def parse_lockstep(self, strings):
+        """Parse many strings at once, on the full automaton"""
+        self.materialize()
+        return super().parse_lockstep(strings)
+    
+    def pack(self):
+        """Return (kind, header, table bytes) of the full automaton"""
+        self.materialize()
+        return super().pack()
+
+
+def _ll1_accepts(predict, rules, start, codes):
+    """Run the table-driven LL(1) parser over encoded input (see LL1Table._compile)"""
+    
+    length = len(codes)
+    
+    # Initialize stack with end marker and start symbol
+    stack = [0, start]
+    position = 0
+    current = codes[0]
+    
+    while stack:
+        top = stack.pop()
+        
+        # Top is a terminal or $
+        if top >= 0:
+            if top != current:
+                return False  # Mismatch
+            position += 1
+            if top == 0:
+                return position == length
+            current = codes[position]
+        
+        # Top is a nonterminal: push the predicted production
+        else:
+            rule = predict[~top + current]
+            if not rule:
+                return False  # No production found
+            stack.extend(rules[rule])
+    
+    return position == length
+
+
+def _slr1_accepts(table, rhs_lengths, goto_columns, codes):
+    """Run the table-driven SLR(1) parser over encoded input (see SLRAutomaton._compile)"""
+    
+    # The stack only holds states (as row offsets), starting with state 0
+    stack = [0]
+    state = 0
+    position = 0
+    current = codes[0]
+    
+    while True:
+        act = table[state + current]
+        
+        if act > 0:  # Shift
+            state = act - 1
+            stack.append(state)
+            position += 1
+            current = codes[position]
+        elif act < 0:
+            rule = ~act
+            if not rule:  # Accept
+                return True
+            
+            # Reduce: pop one state per symbol of the right-hand side
+            n = rhs_lengths[rule]
+            if n:
+                del stack[-n:]
+            
+            # Push the goto state
+            state = table[stack[-1] + goto_columns[rule]]
+            if not state:
+                return False
+            stack.append(state)
+        else:
+            return False
+
+
+def _slr1_lazy_accepts(automaton, codes):
+    """_slr1_accepts for a LazySLRAutomaton, building states as they are entered"""
+    
+    # The arrays grow in place as states are added
+    table = automaton.action_goto
+    built = automaton.built
+    width = automaton.width
+    rhs_lengths = automaton.rhs_lengths
+    goto_columns = automaton.goto_columns
+    
+    # Rows marked other than 1 are not built yet or have a conflict to report
+    if built[0] != 1:
+        automaton.reach(0)
+    stack = [0]
+    state = 0
+    position = 0
+    current = codes[0]
+    
+    while True:
+        act = table[state + current]
+        
+        if act > 0:  # Shift
+            state = act - 1
+            if built[state // width] != 1:
+                automaton.reach(state)
+            stack.append(state)
+            position += 1
+            current = codes[position]
+        elif act < 0:
+            rule = ~act
+            if not rule:  # Accept
+                return True
+            
+            # Reduce: pop one state per symbol of the right-hand side
+            n = rhs_lengths[rule]
+            if n:
+                del stack[-n:]
+            
+            # Push the goto state
+            state = table[stack[-1] + goto_columns[rule]]
+            if not state:
+                return False
+            if built[state // width] != 1:
+                automaton.reach(state)
+            stack.append(state)
+        else:
+            return False
+
+
+def _common_prefix(previous, codes, limit):
+    """Length of the common prefix of two code lists, at most limit"""
+    n = min(len(previous), len(codes), limit)
+    if previous[:n] == codes[:n]:
+        return n
+    i = 0
+    while previous[i] == codes[i]:
+        i += 1
+    return i
+
+
+def _ll1_accepts_shared(predict, rules, start, sequences):
+    """Run the LL(1) driver over many encoded strings, sharing their prefixes.
+    
+    The strings are visited in sorted order, keeping the parser stack after
+    every symbol of the current one as a linked list of (symbol, rest)
+    pairs. Each string resumes from the stack of the prefix it shares with
+    the previous one. Returns the answers in the original order.
+    """
+    
+    results = [False] * len(sequences)
+    
+    # configurations[k]: stack after the first k symbols of the previous
+    # string, or once decided False, or None when its $ was matched
+    configurations = [(start, (0, None))]
+    previous = []
+    
+    for index in sorted(range(len(sequences)), key=sequences.__getitem__):
+        codes = sequences[index]
+        position = _common_prefix(previous, codes, len(configurations) - 1)
+        del configurations[position + 1:]
+        previous = codes
+        
+        stack = configurations[position]
+        while stack.__class__ is tuple:
+            current = codes[position]
+            
+            # Expand nonterminals until a terminal is on top
+            while True:
+                top, stack = stack
+                if top >= 0:
+                    break
+                rule = predict[~top + current]
+                if not rule:
+                    break
+                for symbol in rules[rule]:
+                    stack = (symbol, stack)
+            
+            if top != current:
+                stack = False  # Mismatch or no production found
+            elif top == 0:
+                stack = None
+            position += 1
+            configurations.append(stack)
+        
+        # Matching the final $ only accepts at the end of the string
+        results[index] = position == len(codes) if stack is None else stack
+    return results
+
+
+def _slr1_accepts_shared(table, rhs_lengths, goto_columns, sequences):
+    """Run the SLR(1) driver over many encoded strings, sharing their prefixes.
+    
+    As _ll1_accepts_shared, with the state stack kept as a linked list of
+    (state, rest) pairs.
+    """
+    
+    results = [False] * len(sequences)
+    
+    # configurations[k]: state stack after shifting the first k symbols of
+    # the previous string, or its answer once decided
+    configurations = [(0, None)]
+    previous = []
+    
+    for index in sorted(range(len(sequences)), key=sequences.__getitem__):
+        codes = sequences[index]
+        position = _common_prefix(previous, codes, len(configurations) - 1)
+        del configurations[position + 1:]
+        previous = codes
+        
+        stack = configurations[position]
+        while stack.__class__ is tuple:
+            current = codes[position]
+            state = stack[0]
+            
+            # Reduce until the symbol is shifted
+            while True:
+                act = table[state + current]
+                if act > 0:  # Shift
+                    stack = (act - 1, stack)
+                    break
+                if not act:
+                    stack = False
+                    break
+                rule = ~act
+                if not rule:  # Accept
+                    stack = True
+                    break
+                
+                # Reduce: pop one state per symbol of the right-hand side
+                for _ in range(rhs_lengths[rule]):
+                    stack = stack[1]
+                state = table[stack[0] + goto_columns[rule]]
+                if not state:
+                    stack = False
+                    break
+                stack = (state, stack)
+            
+            position += 1
+            configurations.append(stack)
+        
+        results[index] = stack
+    return results
+
+
+def _import_numpy():
+    """Return the numpy module, or None when it is not installed"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _code_matrix(np, terminal_ids, strings, tokenizer=None):
+    """Encode strings into one int matrix, one row each padded with $ (id 0).
+    
+    Returns the matrix and the length of every encoded string, as _encode
+    would give it. Plain strings of single character terminals are encoded
+    all at once.
+    """
+    
+    n = len(strings)
+    if tokenizer is None and all(string.__class__ is str for string in strings):
+        lengths = np.array([len(string) for string in strings], dtype=np.intp)
+        chars = np.frombuffer(''.join(strings).encode('utf-32-le'), dtype='<u4')
+        unique, inverse = np.unique(chars, return_inverse=True)
+        ids = np.array([terminal_ids[chr(char)] for char in unique.tolist()], dtype=np.intc)
+        flat = ids[inverse.reshape(-1)]
+        
+        # A $ is added unless the string already ends with one
+        last = np.cumsum(lengths) - 1
+        ends_with_end = np.zeros(n, dtype=bool)
+        nonempty = lengths > 0
+        ends_with_end[nonempty] = flat[last[nonempty]] == 0
+        total = lengths + ~ends_with_end
+    else:
+        sequences = [_encode(terminal_ids, string, tokenizer) for string in strings]
+        flat = np.fromiter((code for codes in sequences for code in codes), dtype=np.intc)
+        lengths = total = np.array([len(codes) for codes in sequences], dtype=np.intp)
+    
+    # Padding with zeros fills in the final $
+    matrix = np.zeros((n, int(total.max())), dtype=np.intc)
+    matrix[np.arange(matrix.shape[1]) < lengths[:, None]] = flat
+    return matrix, total
+
+
+def _grow_stacks(np, stacks, needed):
+    """Return the stack matrix with room for at least ``needed`` entries per row"""
+    if needed <= stacks.shape[1]:
+        return stacks
+    return np.concatenate([stacks, np.zeros((stacks.shape[0], max(needed, stacks.shape[1])),
+                                            dtype=stacks.dtype)], axis=1)
+
+
+def _ll1_lockstep(np, predict, rules, start, codes, lengths):
+    """Run the LL(1) driver over many encoded strings at once with NumPy.
+    
+    Every string has its stack in a row of one matrix. Each step reads the
+    top symbol and lookahead of all unfinished strings, matches the
+    terminals and expands the nonterminals through the flat predict table,
+    and drops the strings that were decided. ``codes`` and ``lengths`` come
+    from _code_matrix. Returns a list of answers.
+    """
+    
+    predict = np.frombuffer(predict, dtype=np.intc)
+    
+    # Right-hand sides (already reversed for pushing) padded into a matrix
+    longest = max(len(rhs) for rhs in rules)
+    rule_symbols = np.zeros((len(rules), max(longest, 1)), dtype=np.intc)
+    for rule, rhs in enumerate(rules):
+        rule_symbols[rule, :len(rhs)] = rhs
+    rule_lengths = np.array([len(rhs) for rhs in rules], dtype=np.intp)
+    
+    # Every stack starts as [$, start]
+    n = len(lengths)
+    stacks = np.zeros((n, 64), dtype=np.intc)
+    stacks[:, 1] = start
+    depth = np.full(n, 2, dtype=np.intp)
+    position = np.zeros(n, dtype=np.intp)
+    results = np.zeros(n, dtype=bool)
+    
+    rows = np.arange(n)
+    while rows.size:
+        top = stacks[rows, depth[rows] - 1]
+        current = codes[rows, position[rows]]
+        terminal = top >= 0
+        
+        # Top is a terminal or $: match it, or fail
+        matched = terminal & (top == current)
+        done = rows[matched]
+        depth[done] -= 1
+        position[done] += 1
+        end = matched & (top == 0)
+        done = rows[end]
+        results[done] = position[done] == lengths[done]
+        
+        # Top is a nonterminal: replace it with the predicted production
+        nonterminal = np.flatnonzero(~terminal)
+        rule = predict[~top[nonterminal] + current[nonterminal]]
+        found = rule != 0
+        nonterminal, rule = nonterminal[found], rule[found]
+        expanded = rows[nonterminal]
+        depth[expanded] -= 1
+        pushed = rule_lengths[rule]
+        if expanded.size:
+            stacks = _grow_stacks(np, stacks, int((depth[expanded] + pushed).max()))
+        for k in range(longest):
+            has = pushed > k
+            stacks[expanded[has], depth[expanded[has]] + k] = rule_symbols[rule[has], k]
+        depth[expanded] += pushed
+        
+        keep = matched & ~end
+        keep[nonterminal] = True
+        rows = rows[keep]
+    
+    return results.tolist()
+
+
+def _slr1_lockstep(np, table, rhs_lengths, goto_columns, codes):
+    """Run the SLR(1) driver over many encoded strings at once with NumPy.
+    
+    As _ll1_lockstep, with a state stack per row: each step looks up the
+    action of every unfinished string in the flat ACTION/GOTO table and
+    applies the shifts, reductions, accepts and errors to the matching rows.
+    """
+    
+    table = np.frombuffer(table, dtype=np.intc)
+    rhs_lengths = np.array(rhs_lengths, dtype=np.intp)
+    goto_columns = np.array(goto_columns, dtype=np.intp)
+    
+    # Every stack starts as [0], the initial state
+    n = len(codes)
+    stacks = np.zeros((n, 64), dtype=np.intc)
+    depth = np.ones(n, dtype=np.intp)
+    state = np.zeros(n, dtype=np.intp)
+    position = np.zeros(n, dtype=np.intp)
+    results = np.zeros(n, dtype=bool)
+    
+    rows = np.arange(n)
+    while rows.size:
+        act = table[state[rows] + codes[rows, position[rows]]]
+        
+        # Shift
+        shift = act > 0
+        shifted = rows[shift]
+        if shifted.size:
+            stacks = _grow_stacks(np, stacks, int(depth[shifted].max()) + 1)
+        target = act[shift] - 1
+        stacks[shifted, depth[shifted]] = target
+        depth[shifted] += 1
+        position[shifted] += 1
+        state[shifted] = target
+        
+        # Accept
+        results[rows[act == -1]] = True
+        
+        # Reduce: pop one state per symbol of the right-hand side, push the goto state
+        reduce = np.flatnonzero(act < -1)
+        rule = ~act[reduce]
+        reduced = rows[reduce]
+        depth[reduced] -= rhs_lengths[rule]
+        target = table[stacks[reduced, depth[reduced] - 1] + goto_columns[rule]]
+        found = target != 0
+        reduce, reduced, target = reduce[found], reduced[found], target[found]
+        if reduced.size:
+            stacks = _grow_stacks(np, stacks, int(depth[reduced].max()) + 1)
+        stacks[reduced, depth[reduced]] = target
+        depth[reduced] += 1
+        state[reduced] = target
+        
+        keep = shift
+        keep[reduce] = True
+        rows = rows[keep]
+    
+    return results.tolist()
+
+
+def _ll1_trace(predict, rules, start, codes, stats):
+    """_ll1_accepts, also counting predictions, matches and stack depth into stats"""
+    
+    length = len(codes)
+    stack = [0, start]
+    position = 0
+    current = codes[0]
+    predicts = matches = 0
+    max_stack = len(stack)
+    accepted = False
+    
+    while stack:
+        top = stack.pop()
+        if top >= 0:
+            if top != current:
+                break
+            matches += 1
+            position += 1
+            if top == 0:
+                accepted = position == length
+                break
+            current = codes[position]
+        else:
+            rule = predict[~top + current]
+            if not rule:
+                break
+            predicts += 1
+            stack.extend(rules[rule])
+            if len(stack) > max_stack:
+                max_stack = len(stack)
+    else:
+        accepted = position == length
+    
+    stats.count('ll1_parses')
+    stats.count('ll1_predicts', predicts)
+    stats.count('ll1_matches', matches)
+    stats.maximum('ll1_max_stack', max_stack)
+    return accepted
+
+
+def _slr1_trace(table, rhs_lengths, goto_columns, codes, stats):
+    """_slr1_accepts, also counting shifts, reductions and stack depth into stats"""
+    
+    stack = [0]
+    state = 0
+    position = 0
+    current = codes[0]
+    shifts = reduces = 0
+    max_stack = 1
+    accepted = False
+    
+    while True:
+        act = table[state + current]
+        if act > 0:
+            shifts += 1
+            state = act - 1
+            stack.append(state)
+            if len(stack) > max_stack:
+                max_stack = len(stack)
+            position += 1
+            current = codes[position]
+        elif act < 0:
+            rule = ~act
+            if not rule:
+                accepted = True
+                break
+            reduces += 1
+            n = rhs_lengths[rule]
+            if n:
+                del stack[-n:]
+            state = table[stack[-1] + goto_columns[rule]]
+            if not state:
+                break
+            stack.append(state)
+            if len(stack) > max_stack:
+                max_stack = len(stack)
+        else:
+            break
+    
+    stats.count('slr1_parses')
+    stats.count('slr1_shifts', shifts)
+    stats.count('slr1_reduces', reduces)
+    stats.maximum('slr1_max_stack', max_stack)
+    return accepted
+
+
+def _ll1_tree(predict, rules, tree_rules, start, codes, tree, root):
+    """_ll1_accepts, also adding the derivation below root to tree"""
+    
+    length = len(codes)
+    stack = [0, start]
+    nodes = [-1, root]
+    position = 0
+    current = codes[0]
+    productions, first_child, next_sibling = tree.productions, tree.first_child, tree.next_sibling
+    add_symbols, add_productions = tree.symbols.extend, productions.extend
+    add_first_children, add_next_siblings = first_child.extend, next_sibling.extend
+    count = len(tree)
+    
+    while stack:
+        top = stack.pop()
+        node = nodes.pop()
+        if top >= 0:
+            if top != current:
+                return False
+            position += 1
+            if top == 0:
+                return position == length
+            current = codes[position]
+        else:
+            rule = predict[~top + current]
+            if not rule:
+                return False
+            
+            # Give the node its children, which are consecutive nodes, then
+            # push them like the symbols
+            prod_idx, children, no_links = tree_rules[rule]
+            productions[node] = prod_idx
+            n = len(children)
+            if n:
+                first_child[node] = count
+                add_symbols(children)
+                add_productions(no_links)
+                add_first_children(no_links)
+                add_next_siblings(range(count + 1, count + n))
+                next_sibling.append(-1)
+                stack.extend(rules[rule])
+                nodes.extend(range(count + n - 1, count - 1, -1))
+                count += n
+    
+    return position == length
+
+
+def _slr1_tree(table, rhs_lengths, goto_columns, tree_rules, codes, tree):
+    """_slr1_accepts, also building the tree of the derivation in tree"""
+    
+    stack = [0]
+    nodes = [-1]
+    state = 0
+    position = 0
+    current = codes[0]
+    
+    # The arena arrays are appended to directly, one item each per node
+    add_symbol = tree.symbols.append
+    add_production = tree.productions.append
+    add_first_child = tree.first_child.append
+    add_next_sibling = tree.next_sibling.append
+    next_sibling = tree.next_sibling
+    count = len(tree)
+    
+    while True:
+        act = table[state + current]
+        
+        if act > 0:  # Shift a leaf
+            state = act - 1
+            stack.append(state)
+            add_symbol(current)
+            add_production(-1)
+            add_first_child(-1)
+            add_next_sibling(-1)
+            nodes.append(count)
+            count += 1
+            position += 1
+            current = codes[position]
+        elif act < 0:
+            rule = ~act
+            if not rule:  # Accept
+                tree.root = nodes[-1]
+                return True
+            
+            # Reduce: the popped nodes become the children of a new node
+            n = rhs_lengths[rule]
+            symbol, prod_idx = tree_rules[rule]
+            add_symbol(symbol)
+            add_production(prod_idx)
+            add_next_sibling(-1)
+            if n:
+                children = nodes[-n:]
+                add_first_child(children[0])
+                for k in range(n - 1):
+                    next_sibling[children[k]] = children[k + 1]
+                del stack[-n:]
+                del nodes[-n:]
+            else:
+                add_first_child(-1)
+            node = count
+            count += 1
+            
+            state = table[stack[-1] + goto_columns[rule]]
+            if not state:
+                return False
+            stack.append(state)
+            nodes.append(node)
+        else:
+            return False
+
+
+class ParseTree:
+    """Parse tree kept in four flat integer arrays (an arena) instead of one
+    object per node.
+    
+    Node i is a symbol, symbols[i], indexing ``names``; productions[i] is the
+    production index of a nonterminal node and -1 for a terminal leaf;
+    first_child[i] and next_sibling[i] link the nodes, with -1 for none.
+    Epsilon productions give nonterminal nodes without children.
+    """
+    
+    MAGIC = b'LFT\0'
+    
+    def __init__(self, names, root=0):
+        self.names = names
+        self.root = root
+        self.symbols = array('i')
+        self.productions = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+    
+    def __len__(self):
+        return len(self.symbols)
+    
+    def add(self, symbol, production=-1):
+        """Append a node without children and return its index"""
+        self.symbols.append(symbol)
+        self.productions.append(production)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        return len(self.symbols) - 1
+    
+    def symbol(self, node):
+        """Name of the symbol of a node"""
+        return self.names[self.symbols[node]]
+    
+    def children(self, node):
+        """Yield the children of a node, left to right"""
+        child = self.first_child[node]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+    
+    def walk(self, node=None):
+        """Yield (node, depth) for the subtree of node (the root by default) in preorder"""
+        first_child, next_sibling = self.first_child, self.next_sibling
+        stack = [(self.root if node is None else node, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            
+            # Push the siblings right to left so the leftmost comes out first
+            children = []
+            child = first_child[node]
+            while child >= 0:
+                children.append((child, depth + 1))
+                child = next_sibling[child]
+            stack.extend(reversed(children))
+    
+    def leaves(self):
+        """Yield the terminal names at the leaves, left to right"""
+        for node, _ in self.walk():
+            if self.productions[node] < 0:
+                yield self.symbol(node)
+    
+    def __str__(self):
+        """Bracketed form, such as (S (A a) b)"""
+        parts = []
+        depths = []
+        for node, depth in self.walk():
+            while depths and depths[-1] >= depth:
+                depths.pop()
+                parts.append(')')
+            if self.productions[node] < 0:
+                parts.append(' ' + self.symbol(node) if parts else self.symbol(node))
+            else:
+                parts.append((' (' if parts else '(') + self.symbol(node))
+                depths.append(depth)
+        parts.append(')' * len(depths))
+        return ''.join(parts)
+    
+    def to_bytes(self):
+        """Serialize the tree: magic, node count, root, names and the four arrays"""
+        names = json.dumps(self.names, separators=(',', ':')).encode()
+        header = struct.pack('<4sIiI', self.MAGIC, len(self), self.root, len(names))
+        return b''.join([header, names, self.symbols.tobytes(), self.productions.tobytes(),
+                         self.first_child.tobytes(), self.next_sibling.tobytes()])
+    
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a tree written by to_bytes on a machine with the same int size"""
+        magic, count, root, names_length = struct.unpack_from('<4sIiI', data)
+        if magic != cls.MAGIC:
+            raise ValueError("not a serialized parse tree")
+        offset = struct.calcsize('<4sIiI')
+        tree = cls(json.loads(bytes(data[offset:offset + names_length])), root)
+        offset += names_length
+        
+        size = count * tree.symbols.itemsize
+        for values in (tree.symbols, tree.productions, tree.first_child, tree.next_sibling):
+            values.frombytes(data[offset:offset + size])
+            offset += size
+        return tree
+
+
+class PackedParser:
+    """Recognizer rebuilt from LL1Table.pack() or SLRAutomaton.pack().
+    
+    It needs neither the Grammar nor the dict tables, and ``table`` can be
+    any buffer of native ints, such as a shared memory block or a mmap.
+    """
+    
+    def __init__(self, kind, header, table, tokenizer=None):
+        self.kind = kind
+        self.header = header
+        self.tokenizer = tokenizer
+        self.terminal_ids = _TerminalIds(
+            {t: i for i, t in enumerate(header[0])}, len(header[0]))
+        
+        # The driver tables keep the attribute names of the compiled objects
+        table = table if isinstance(table, array) else memoryview(table).cast('i')
+        if kind == 'LL1':
+            self.predict = table
+            self.start, self.rules = header[1], header[2]
+        else:  # SLR1
+            self.action_goto = table
+            self.rhs_lengths, self.goto_columns = header[1], header[2]
+    
+    def parse(self, input_string):
+        """Parse a string with the packed table"""
+        codes = _encode(self.terminal_ids, input_string, self.tokenizer)
+        if self.kind == 'LL1':
+            return _ll1_accepts(self.predict, self.rules, self.start, codes)
+        return _slr1_accepts(self.action_goto, self.rhs_lengths, self.goto_columns, codes)
+    
+    def trace(self, input_string, stats):
+        """Parse like parse(), counting the parser steps into a GrammarStats"""
+        codes = _encode(self.terminal_ids, input_string, self.tokenizer)
+        if self.kind == 'LL1':
+            return _ll1_trace(self.predict, self.rules, self.start, codes, stats)
+        return _slr1_trace(self.action_goto, self.rhs_lengths, self.goto_columns, codes, stats)
+    
+    def parse_batch(self, strings):
+        """Parse many strings, sharing the work of their common prefixes"""
+        sequences = [_encode(self.terminal_ids, string, self.tokenizer) for string in strings]
+        if self.kind == 'LL1':
+            return _ll1_accepts_shared(self.predict, self.rules, self.start, sequences)
+        return _slr1_accepts_shared(self.action_goto, self.rhs_lengths, self.goto_columns,
+                                    sequences)
+    
+    def parse_lockstep(self, strings):
+        """Parse many strings at once with NumPy, or one by one without it"""
+        numpy = _import_numpy()
+        if numpy is None or not strings:
+            return [self.parse(string) for string in strings]
+        codes, lengths = _code_matrix(numpy, self.terminal_ids, strings, self.tokenizer)
+        if self.kind == 'LL1':
+            return _ll1_lockstep(numpy, self.predict, self.rules, self.start, codes, lengths)
+        return _slr1_lockstep(numpy, self.action_goto, self.rhs_lengths, self.goto_columns,
+                              codes)
+    
+    def pack(self):
+        """Return (kind, header, table bytes), as the compiled tables do"""
+        table = self.predict if self.kind == 'LL1' else self.action_goto
+        return self.kind, self.header, bytes(table)
+
+
+class CachedTable(PackedParser):
+    """LL(1) table or SLR(1) automaton loaded from the on-disk cache.
+    
+    Only the packed driver table and the conflict list are stored, so the
+    dict tables and LR(0) items of the original objects are not available.
+    """
+    
+    def __init__(self, kind, header, table, conflicts, tokenizer=None):
+        super().__init__(kind, header, table, tokenizer)
+        self.conflicts = conflicts
+    
+    def is_ll1(self):
+        """The grammar is LL(1) when no cell of the table has two entries"""
+        return not self.conflicts
+    
+    def is_slr1(self):
+        """The grammar is SLR(1) when no ACTION cell has two entries"""
+        return not self.conflicts
+
+
+class LL1PushParser:
+    """Incremental LL(1) recognizer fed with chunks of input.
+    
+    Works on a compiled LL(1) table (LL1Table, PackedParser or CachedTable)
+    and keeps only the parser stack between calls. Chunks are sequences of
+    terminals: strings of characters, or lists of tokens for grammars with
+    a tokenizer (see Tokenizer.stream). feed(chunk) returns
+    False as soon as the input read so far cannot be the start of a
+    sentence, and finish() gives the same answer as parse() on the whole
+    input.
+    """
+    
+    def __init__(self, compiled):
+        self.predict = compiled.predict
+        self.rules = compiled.rules
+        self.terminal_ids = compiled.terminal_ids
+        
+        # Initialize stack with end marker and start symbol
+        self.stack = [0, compiled.start]
+        self.dead = False
+        self.matched_end = False  # The bottom $ was matched by a $ in the input
+    
+    def feed(self, chunk):
+        """Consume more input; return whether it is still a viable prefix"""
+        
+        if self.dead:
+            return False
+        
+        predict = self.predict
+        rules = self.rules
+        stack = self.stack
+        for current in map(self.terminal_ids.__getitem__, chunk):
+            # Nothing may follow the $ that ends the sentence
+            if self.matched_end:
+                self.dead = True
+                return False
+            
+            # Expand nonterminals until a terminal is matched
+            while True:
+                top = stack.pop()
+                if top >= 0:
+                    break
+                rule = predict[~top + current]
+                if not rule:
+                    self.dead = True
+                    return False
+                stack.extend(rules[rule])
+            
+            if top != current:
+                self.dead = True
+                return False
+            if top == 0:
+                self.matched_end = True
+        return True
+    
+    def is_viable_prefix(self):
+        """Whether the input fed so far can still be extended to a sentence"""
+        return not self.dead
+    
+    def finish(self):
+        """End the input and return whether it is accepted"""
+        
+        # Add end marker if the input did not end with one
+        if not self.dead and not self.matched_end:
+            self.feed('$')
+        return self.matched_end and not self.dead
+
+
+class SLRPushParser:
+    """Incremental SLR(1) recognizer fed with chunks of input.
+    
+    Works on a compiled SLR(1) automaton (SLRAutomaton, PackedParser or
+    CachedTable) and keeps only the state stack between calls. Chunks are
+    sequences of terminals, as for LL1PushParser. feed(chunk)
+    returns False as soon as the input read so far cannot be the start of a
+    sentence, and finish() gives the same answer as parse() on the whole
+    input.
+    """
+    
+    def __init__(self, compiled):
+        self.table = compiled.action_goto
+        self.rhs_lengths = compiled.rhs_lengths
+        self.goto_columns = compiled.goto_columns
+        self.terminal_ids = compiled.terminal_ids
+        
+        # The stack only holds states (as row offsets), starting with state 0
+        self.stack = [0]
+        self.dead = False
+        self.accepted = False
+    
+    def feed(self, chunk):
+        """Consume more input; return whether it is still a viable prefix"""
+        
+        # Like parse(), whatever follows an accepting $ is ignored
+        if self.dead or self.accepted:
+            return not self.dead
+        
+        table = self.table
+        rhs_lengths = self.rhs_lengths
+        goto_columns = self.goto_columns
+        stack = self.stack
+        state = stack[-1]
+        for current in map(self.terminal_ids.__getitem__, chunk):
+            # Reduce until the symbol is shifted
+            while True:
+                act = table[state + current]
+                if act > 0:  # Shift
+                    state = act - 1
+                    stack.append(state)
+                    break
+                if not act:
+                    self.dead = True
+                    return False
+                
+                rule = ~act
+                if not rule:  # Accept
+                    self.accepted = True
+                    return True
+                
+                # Reduce: pop one state per symbol of the right-hand side
+                n = rhs_lengths[rule]
+                if n:
+                    del stack[-n:]
+                state = table[stack[-1] + goto_columns[rule]]
+                if not state:
+                    self.dead = True
+                    return False
+                stack.append(state)
+        return True
+    
+    def is_viable_prefix(self):
+        """Whether the input fed so far can still be extended to a sentence"""
+        return not self.dead
+    
+    def finish(self):
+        """End the input and return whether it is accepted"""
+        
+        # Add end marker; a $ in the input has already accepted or failed
+        if not self.dead and not self.accepted:
+            self.feed('$')
+        return self.accepted
+
+
+class Grammar:
+    
+    def __init__(self, productions, start='S', nonterminals=None, tokenizer=None, stats=None):
+        """Analyse a grammar given as {nonterminal: [production, ...]}.
+        
+        By default (the project input format) symbols are single characters,
+        uppercase ones are nonterminals, ['e'] is the empty production and S
+        is the start symbol. Grammars with named symbols pass ``start``, the
+        set of ``nonterminals`` (every other symbol is a terminal), use []
+        for the empty production, and may bring a Tokenizer for their input.
+        A GrammarStats given as ``stats`` records the time of every phase
+        and the work done by the analysis and the parsers.
+        """
+        self.start = start
+        self.declared_nonterminals = nonterminals
+        self.tokenizer = tokenizer
+        self.stats = stats
+        self.productions = productions
+    
+    @property
+    def productions(self):
+        return self._productions
+    
+    @productions.setter
+    def productions(self, productions):
+        # Assigning new productions recomputes everything derived from them
+        self._productions = productions
+        self.invalidate()
+    
+    @classmethod
+    def from_analysis(cls, productions, first_sets, follow_sets,
+                      ll1_table=None, slr1_automaton=None,
+                      start='S', nonterminals=None, tokenizer=None, stats=None):
+        """Build a Grammar from a FIRST/FOLLOW analysis and tables computed earlier"""
+        grammar = cls.__new__(cls)
+        grammar.start = start
+        grammar.declared_nonterminals = nonterminals
+        grammar.tokenizer = tokenizer
+        grammar.stats = stats
+        grammar._productions = productions
+        grammar._extract_symbols()
+        grammar._first_sets = first_sets
+        grammar._follow_sets = follow_sets
+        grammar.first_bits = {symbol: grammar.terminal_mask(values)
+                              for symbol, values in first_sets.items()}
+        grammar.follow_bits = {symbol: grammar.terminal_mask(values)
+                               for symbol, values in follow_sets.items()}
+        grammar.compute_suffix_first_sets()
+        grammar._symbols = None
+        grammar._ll1_table = ll1_table
+        grammar._slr1_automaton = slr1_automaton
+        return grammar
+    
+    @property
+    def first_sets(self):
+        """FIRST set of every symbol, decoded from first_bits on first use"""
+        if self._first_sets is None:
+            self._first_sets = {symbol: self.terminal_set(bits)
+                                for symbol, bits in self.first_bits.items()}
+        return self._first_sets
+    
+    @property
+    def follow_sets(self):
+        """FOLLOW set of every nonterminal, decoded from follow_bits on first use"""
+        if self._follow_sets is None:
+            self._follow_sets = {nt: self.terminal_set(bits)
+                                 for nt, bits in self.follow_bits.items()}
+        return self._follow_sets
+    
+    def invalidate(self):
+        """Recompute symbols and FIRST/FOLLOW and drop the compiled tables.
+        
+        Called automatically when ``productions`` is assigned; call it by hand
+        after editing the production lists in place.
+        """
+        self._extract_symbols()
+        
+        with _phase(self.stats, 'first'):
+            self.compute_first_sets()
+            self.compute_suffix_first_sets()
+        with _phase(self.stats, 'follow'):
+            self.compute_follow_sets()
+        
+        # Compiled tables are built lazily on first use
+        self._symbols = None
+        self._ll1_table = None
+        self._slr1_automaton = None
+    
+    def _extract_symbols(self):
+        """Collect the terminals and nonterminals used by the productions"""
+        self.nonterminals = set()
+        self.terminals = set()
+        
+        # Named symbols: the declared nonterminals and every other symbol
+        if self.declared_nonterminals is not None:
+            self.nonterminals.update(self.declared_nonterminals, self.productions)
+            for prods in self.productions.values():
+                for prod in prods:
+                    self.terminals.update(symbol for symbol in prod
+                                          if symbol not in self.nonterminals)
+            self.terminals.discard('e')
+        
+        # Extract terminals and nonterminals
+        else:
+            for nt, prods in self.productions.items():
+                self.nonterminals.add(nt)
+                for prod in prods:
+                    for symbol in prod:
+                        if symbol.isupper():
+                            self.nonterminals.add(symbol)
+                        elif symbol != 'e':
+                            self.terminals.add(symbol)
+        
+        # Add end-of-input marker
+        self.terminals.add('$')
+        
+        # Number the terminals for the bitsets; bit 0 is reserved for epsilon
+        self.terminal_names = ['e'] + sorted(self.terminals)
+        self.terminal_bits = {t: 1 << i for i, t in enumerate(self.terminal_names)}
+    
+    def terminal_list(self, bits):
+        """Return the terminal names (and 'e') in a bitset, in bit order"""
+        names = self.terminal_names
+        
+        # Bit i is character i of the reversed binary digits
+        digits = bin(bits)[:1:-1]
+        result = []
+        i = digits.find('1')
+        while i >= 0:
+            result.append(names[i])
+            i = digits.find('1', i + 1)
+        return result
+    
+    def terminal_set(self, bits):
+        """Return the set of terminal names (and 'e') in a bitset"""
+        return set(self.terminal_list(bits))
+    
+    def terminal_mask(self, terminals):
+        """Return the bitset of a collection of terminal names (and 'e')"""
+        bits = self.terminal_bits
+        mask = 0
+        for terminal in terminals:
+            mask |= bits[terminal]
+        return mask
+    
+    def compute_first_sets(self):
+        """Compute FIRST sets for all nonterminals and terminals"""
+        
+        nonterminals = self.nonterminals
+        
+        # Nullable nonterminals, by counting down the symbols of each
+        # production that are not yet known to derive epsilon
+        nullable = set()
+        remaining = {}
+        occurrences = {nt: [] for nt in nonterminals}
+        worklist = []
+        steps = 0
+        for nt, prods in self.productions.items():
+            for i, prod in enumerate(prods):
+                if len(prod) == 1 and prod[0] == 'e':
+                    worklist.append(nt)
+                    continue
+                if any(symbol not in nonterminals for symbol in prod):
+                    continue  # A terminal can never vanish
+                remaining[(nt, i)] = len(prod)
+                for symbol in prod:
+                    occurrences[symbol].append((nt, i))
+                if not prod:
+                    worklist.append(nt)
+        
+        while worklist:
+            nt = worklist.pop()
+            steps += 1
+            if nt in nullable:
+                continue
+            nullable.add(nt)
+            for key in occurrences[nt]:
+                remaining[key] -= 1
+                if remaining[key] == 0:
+                    worklist.append(key[0])
+        
+        # FIRST(A) includes FIRST(B) for every A -> αBβ with α nullable, and
+        # the terminal a for every A -> αaβ with α nullable
+        bits = self.terminal_bits
+        direct = {nt: 0 for nt in nonterminals}
+        includes = {nt: set() for nt in nonterminals}
+        for nt, prods in self.productions.items():
+            for prod in prods:
+                for symbol in prod:
+                    if symbol not in nonterminals:
+                        if symbol != 'e':
+                            direct[nt] |= bits[symbol]
+                        break
+                    includes[nt].add(symbol)
+                    if symbol not in nullable:
+                        break
+        
+        first = _digraph(list(nonterminals), includes, direct)
+        if self.stats is not None:
+            steps += len(nonterminals) + sum(map(len, includes.values()))
+            self.stats.count('first_steps', steps)
+        
+        # FIRST of every symbol as a bitset, with bit 0 for a nullable nonterminal;
+        # the FIRST of a terminal (or epsilon) is the terminal itself
+        self.first_bits = dict(bits)
+        for nt in nonterminals:
+            self.first_bits[nt] = first[nt] | (1 if nt in nullable else 0)
+        self._first_sets = None
+    
+    def compute_suffix_first_sets(self):
+        """Compute FIRST of every suffix of every production, as bitsets.
+        
+        suffix_first[(nt, i)][k] is the bitset of first_of_string(prod[k:])
+        for the i-th production of nt, so suffix_first[(nt, i)][len(prod)]
+        is 1, the bit of epsilon.
+        """
+        
+        first_bits = self.first_bits
+        self.suffix_first = {}
+        for nt, prods in self.productions.items():
+            for i, prod in enumerate(prods):
+                suffixes = [0] * len(prod) + [1]
+                for k in range(len(prod) - 1, -1, -1):
+                    first_symbol = first_bits.get(prod[k], 0)
+                    if first_symbol & 1:
+                        suffixes[k] = (first_symbol ^ 1) | suffixes[k + 1]
+                    else:
+                        suffixes[k] = first_symbol
+                self.suffix_first[(nt, i)] = suffixes
+    
+    def first_of_string(self, string):
+        """Compute FIRST set for a string of symbols"""
+        
+        if not string or (len(string) == 1 and string[0] == 'e'):
+            return {'e'}
+        
+        # Add FIRST(symbol) - {e} while the symbols so far can derive epsilon
+        first_bits = self.first_bits
+        result = 0
+        for symbol in string:
+            first_symbol = first_bits.get(symbol, 0)
+            result |= first_symbol & ~1
+            if not first_symbol & 1:
+                break
+        else:
+            # All symbols can derive epsilon
+            result |= 1
+        
+        return self.terminal_set(result)
+    
+    def compute_follow_sets(self):
+        """Compute FOLLOW sets for all nonterminals"""
+        
+        # FOLLOW(B) includes FIRST(β) - {e} for every A -> αBβ, and
+        # includes FOLLOW(A) when β can derive epsilon
+        direct = {nt: 0 for nt in self.nonterminals}
+        includes = {nt: set() for nt in self.nonterminals}
+        
+        # Start symbol has $ in its FOLLOW set
+        direct[self.start] |= self.terminal_bits['$']
+        
+        for nt, prods in self.productions.items():
+            for i, prod in enumerate(prods):
+                suffixes = self.suffix_first[(nt, i)]
+                for k, symbol in enumerate(prod):
+                    if symbol in self.nonterminals:  # Only interested in nonterminals
+                        first_beta = suffixes[k + 1]
+                        if first_beta & 1:
+                            direct[symbol] |= first_beta ^ 1
+                            includes[symbol].add(nt)
+                        else:
+                            direct[symbol] |= first_beta
+        
+        self.follow_bits = _digraph(list(self.nonterminals), includes, direct)
+        if self.stats is not None:
+            self.stats.count('follow_steps', len(self.nonterminals)
+                             + sum(map(len, includes.values())))
+        self._follow_sets = None
+    
+    def compile_symbols(self):
+        """Return the integer ids of the grammar symbols, building them on first use"""
+        if self._symbols is None:
+            self._symbols = SymbolTable(self)
+        return self._symbols
+    
+    def compile_ll1(self):
+        """Return the LL(1) predictive table, building it on first use"""
+        if self._ll1_table is None:
+            with _phase(self.stats, 'll1_table'):
+                self._ll1_table = LL1Table(self)
+        return self._ll1_table
+    
+    def check_ll1(self):
+        """Check if grammar is LL(1)"""
+        return self.compile_ll1().is_ll1()
+    
+    def parse_ll1(self, input_string, tree=False):
+        """Parse a string using LL(1) algorithm.
+        
+        With ``tree`` the ParseTree of the string is returned instead, or
+        None if the string is rejected.
+        """
+        if tree:
+            table = self.compile_ll1()
+            if not isinstance(table, LL1Table):
+                # Cached tables lack the productions; the full table replaces
+                # them once and serves every later parse
+                with _phase(self.stats, 'll1_table'):
+                    table = self._ll1_table = LL1Table(self)
+            return table.parse_tree(input_string)
+        if self.stats is not None:
+            return self.compile_ll1().trace(input_string, self.stats)
+        return self.compile_ll1().parse(input_string)
+    
+    def compile_slr1(self, lazy=False, check_conflicts=False):
+        """Return the SLR(1) automaton, building it on first use.
+        
+        With ``lazy`` the first use builds a LazySLRAutomaton instead, whose
+        states are built as parses reach them; ``check_conflicts`` is passed
+        on to it.
+        """
+        if self._slr1_automaton is None:
+            if lazy:
+                self._slr1_automaton = LazySLRAutomaton(self, check_conflicts)
+            else:
+                self._slr1_automaton = SLRAutomaton(self)
+        return self._slr1_automaton
+    
+    def check_slr1(self):
+        """Check if grammar is SLR(1)"""
+        return self.compile_slr1().is_slr1()
+    
+    def parse_slr1(self, input_string, tree=False):
+        """Parse a string using SLR(1) algorithm.
+        
+        With ``tree`` the ParseTree of the string is returned instead, or
+        None if the string is rejected.
+        """
+        if tree:
+            automaton = self.compile_slr1()
+            if not isinstance(automaton, SLRAutomaton):
+                # Cached tables lack the productions; the full automaton
+                # replaces them once and serves every later parse
+                automaton = self._slr1_automaton = SLRAutomaton(self)
+            return automaton.parse_tree(input_string)
+        if self.stats is not None:
+            return self.compile_slr1().trace(input_string, self.stats)
+        return self.compile_slr1().parse(input_string)
+    
+    def parse_batch(self, parser_type, strings):
+        """Parse a list of strings with 'LL1' or 'SLR1' and return the answers in order.
+        
+        The strings are parsed in sorted order and each one resumes from the
+        parser configuration of the prefix it shares with the previous one,
+        so the work grows with the distinct prefixes rather than with the
+        total length.
+        """
+        compiled = self.compile_parser(parser_type)
+        if self.stats is not None:
+            return [compiled.trace(string, self.stats) for string in strings]
+        return compiled.parse_batch(strings)
+    
+    def parse_lockstep(self, parser_type, strings):
+        """Parse a list of strings with 'LL1' or 'SLR1' in lockstep and return the answers.
+        
+        With NumPy installed every string gets a row of a padded input
+        matrix and of a stack matrix, and all of them advance one parser step
+        at a time through the flat tables, which pays off for large batches
+        of short strings. Without it the strings are parsed one by one; the
+        answers are the same either way.
+        """
+        compiled = self.compile_parser(parser_type)
+        if self.stats is not None:
+            return [compiled.trace(string, self.stats) for string in strings]
+        return compiled.parse_lockstep(strings)
+    
+    def push_parser(self, parser_type):
+        """Return a new incremental parser ('LL1' or 'SLR1') for streamed input"""
+        if parser_type == 'LL1':
+            return LL1PushParser(self.compile_ll1())
+        automaton = self.compile_slr1()
+        if isinstance(automaton, LazySLRAutomaton):
+            automaton.materialize()  # The push parser reads the table directly
+        return SLRPushParser(automaton)
+    
+    def compile_parser(self, parser_type):
+        """Return the compiled LL(1) table or SLR(1) automaton for 'LL1' or 'SLR1'"""
+        if parser_type == 'LL1':
+            return self.compile_ll1()
+        return self.compile_slr1()
+
+
+# On-disk cache of analysed grammars. An entry is one file named after the
+# grammar fingerprint:
+#
+#     magic (4 bytes) | version, header length, CRC-32 of the rest (3 x u32)
+#     | JSON header | padding to 8 bytes | packed LL(1) and SLR(1) tables
+#
+# The tables are native int arrays, read straight from a memory map.
+CACHE_MAGIC = b'LFC\0'
+CACHE_VERSION = 1
+_CACHE_PREFIX = struct.Struct('<4sIII')
+
+
+def grammar_fingerprint(productions, start='S', nonterminals=None):
+    """Return a hash of the productions, in order, as a hex string"""
+    canonical = json.dumps({
+        'start': start,
+        'nonterminals': None if nonterminals is None else sorted(nonterminals),
+        'productions': [[nt, prods] for nt, prods in productions.items()],
+    }, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def load_grammar(productions, cache_dir, start='S', nonterminals=None, tokenizer=None,
+                 stats=None):
+    """Return a Grammar for the productions, from the cache when possible.
+    
+    The keyword arguments are those of Grammar. A missing, stale or corrupt
+    entry is rebuilt and written back, if the cache directory can be written.
+    """
+    options = {'start': start, 'nonterminals': nonterminals, 'tokenizer': tokenizer,
+               'stats': stats}
+    fingerprint = grammar_fingerprint(productions, start, nonterminals)
+    path = os.path.join(cache_dir, fingerprint + '.lfc')
+    
+    grammar = _read_cache_entry(path, fingerprint, productions, options)
+    if grammar is None:
+        grammar = Grammar(productions, **options)
+        try:
+            _write_cache_entry(path, fingerprint, grammar)
+        except OSError:
+            # An unwritable cache only costs the next run the analysis
+            pass
+    return grammar
+
+
+def _read_cache_entry(path, fingerprint, productions, options):
+    """Load a cached Grammar, or return None if the entry is unusable"""
+    
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    
+    try:
+        view = memoryview(data)
+        magic, version, header_length, checksum = _CACHE_PREFIX.unpack_from(view)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return None
+        if zlib.crc32(view[_CACHE_PREFIX.size:]) != checksum:
+            return None
+        
+        header_end = _CACHE_PREFIX.size + header_length
+        header = json.loads(bytes(view[_CACHE_PREFIX.size:header_end]))
+        if (header['fingerprint'] != fingerprint
+                or header['byteorder'] != sys.byteorder
+                or header['itemsize'] != array('i').itemsize):
+            return None
+        
+        tables = {}
+        data_start = _align(header_end)
+        for kind, entry in header['tables'].items():
+            start = data_start + entry['offset']
+            table = view[start:start + entry['length']]
+            tables[kind] = CachedTable(kind, entry['header'], table, entry['conflicts'],
+                                       options['tokenizer'])
+        
+        return Grammar.from_analysis(
+            productions,
+            {symbol: set(values) for symbol, values in header['first_sets'].items()},
+            {symbol: set(values) for symbol, values in header['follow_sets'].items()},
+            tables['LL1'], tables['SLR1'], **options)
+    except (ValueError, KeyError, TypeError, struct.error):
+        return None
+
+
+def _write_cache_entry(path, fingerprint, grammar):
+    """Write the analysis and packed tables of a Grammar to the cache"""
+    
+    tables = {}
+    blobs = []
+    offset = 0
+    for kind in ('LL1', 'SLR1'):
+        compiled = grammar.compile_parser(kind)
+        _, table_header, blob = compiled.pack()
+        tables[kind] = {
+            'header': table_header,
+            'conflicts': compiled.conflicts,
+            'offset': offset,
+            'length': len(blob),
+        }
+        blobs.append(blob)
+        offset += len(blob)
+    
+    header = json.dumps({
+        'fingerprint': fingerprint,
+        'byteorder': sys.byteorder,
+        'itemsize': array('i').itemsize,
+        'first_sets': {symbol: sorted(values) for symbol, values in grammar.first_sets.items()},
+        'follow_sets': {symbol: sorted(values) for symbol, values in grammar.follow_sets.items()},
+        'tables': tables,
+    }, separators=(',', ':')).encode()
+    
+    header_end = _CACHE_PREFIX.size + len(header)
+    body = header + bytes(_align(header_end) - header_end) + b''.join(blobs)
+    prefix = _CACHE_PREFIX.pack(CACHE_MAGIC, CACHE_VERSION, len(header), zlib.crc32(body))
+    
+    # Write to a temporary file of our own first so readers never see a
+    # partial entry, even with several threads writing the same grammar
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(prefix)
+            f.write(body)
+        os.replace(temporary, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporary)
+        raise
+
+
+def _align(offset, alignment=8):
+    """Round offset up to a multiple of alignment"""
+    return -(-offset // alignment) * alignment
+
+
+# Rough bytes taken by one dict entry, set member or list slot of a Grammar
+_ENTRY_SIZE = 100
+
+
+def grammar_key(productions, start='S', nonterminals=None, tokenizer=None):
+    """Return the fingerprint of a grammar together with its token definitions"""
+    fingerprint = grammar_fingerprint(productions, start, nonterminals)
+    if tokenizer is None:
+        return fingerprint
+    canonical = json.dumps([fingerprint, sorted(tokenizer.literals),
+                            tokenizer.patterns, tokenizer.ignore], separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def estimate_grammar_size(grammar):
+    """Rough number of bytes held by a Grammar and the tables built so far"""
+    
+    entries = len(grammar.first_bits) + len(grammar.follow_bits)
+    for prods in grammar.productions.values():
+        entries += sum(len(prod) + 1 for prod in prods)
+    entries += sum(len(suffixes) for suffixes in grammar.suffix_first.values())
+    size = 0
+    
+    ll1_table = grammar._ll1_table
+    if ll1_table is not None:
+        size += memoryview(ll1_table.predict).nbytes
+        if isinstance(ll1_table, LL1Table):
+            entries += len(ll1_table.first_of_prod)
+            entries += sum(len(row) for row in ll1_table.table.values())
+    
+    automaton = grammar._slr1_automaton
+    if automaton is not None:
+        size += memoryview(automaton.action_goto).nbytes
+        if isinstance(automaton, SLRAutomaton):
+            entries += sum(len(row) for row in automaton.action)
+            entries += sum(len(row) for row in automaton.goto_table)
+            entries += sum(len(kernel) for kernel in automaton.kernels)
+    
+    return size + entries * _ENTRY_SIZE
+
+
+class _RegistryEntry:
+    """What a GrammarRegistry remembers of one grammar, resident or not"""
+    
+    __slots__ = ('productions', 'start', 'nonterminals', 'tokenizer',
+                 'grammar', 'built', 'size', 'll1', 'slr1')
+    
+    def __init__(self, productions, start, nonterminals, tokenizer):
+        self.productions = productions
+        self.start = start
+        self.nonterminals = nonterminals
+        self.tokenizer = tokenizer
+        self.grammar = None
+        self.built = False
+        self.size = 0
+        self.ll1 = None
+        self.slr1 = None
+
+
+class GrammarRegistry:
+    """Analysed grammars shared by key, within a memory budget.
+    
+    Grammars with the same productions, start symbol, nonterminals and
+    tokenizer (see grammar_key) get one Grammar instance. When the estimated
+    size of the resident grammars exceeds ``max_bytes``, the least recently
+    used ones are dropped; only their productions and LL(1)/SLR(1)
+    classification are kept, and the Grammar is rebuilt (through the
+    on-disk cache when ``cache_dir`` is given) the next time it is needed.
+    Past ``max_grammars`` registered grammars, the least recently used of
+    the evicted ones are forgotten altogether and their keys become
+    unknown. ``hits``, ``misses``, ``rebuilds``, ``evictions`` and
+    ``forgotten`` count what happened. The registry can be used from
+    several threads.
+    """
+    
+    def __init__(self, max_bytes=256 << 20, cache_dir=None, stats=None, max_grammars=4096):
+        self.max_bytes = max_bytes
+        self.max_grammars = max_grammars
+        self.cache_dir = cache_dir
+        self.stats = stats
+        
+        # key -> _RegistryEntry, both in least recently used order; the
+        # second only holds the resident entries
+        self._entries = OrderedDict()
+        self._resident = OrderedDict()
+        self.resident_bytes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.evictions = 0
+        self.forgotten = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def get(self, productions, start='S', nonterminals=None, tokenizer=None):
+        """Return the shared Grammar for these productions, building it if needed.
+        
+        The arguments are those of Grammar.
+        """
+        key = grammar_key(productions, start, nonterminals, tokenizer)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = _RegistryEntry(productions, start, nonterminals, tokenizer)
+                self._forget(key)
+        return self.grammar(key)
+    
+    def add(self, grammar):
+        """Register a Grammar built elsewhere and return its key.
+        
+        If an identical grammar is already resident, that one is kept.
+        """
+        key = grammar_key(grammar.productions, grammar.start,
+                          grammar.declared_nonterminals, grammar.tokenizer)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _RegistryEntry(grammar.productions, grammar.start,
+                                       grammar.declared_nonterminals, grammar.tokenizer)
+                self._entries[key] = entry
+                self._forget(key)
+            if entry.grammar is None:
+                entry.grammar = grammar
+                entry.built = True
+                self._update(key)
+        return key
+    
+    def grammar(self, key):
+        """Return the Grammar of a registered key, rebuilding it after an eviction"""
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                raise KeyError("unknown grammar %s" % key)
+            self._entries.move_to_end(key)
+            if entry.grammar is not None:
+                self.hits += 1
+                self._resident.move_to_end(key)
+                return entry.grammar
+            self.misses += 1
+            if entry.built:
+                self.rebuilds += 1
+            entry.built = True
+        
+        # Analyse outside the lock so the other grammars stay available
+        options = {'start': entry.start, 'nonterminals': entry.nonterminals,
+                   'tokenizer': entry.tokenizer, 'stats': self.stats}
+        if self.cache_dir is not None:
+            grammar = load_grammar(entry.productions, self.cache_dir, **options)
+        else:
+            grammar = Grammar(entry.productions, **options)
+        
+        with self._lock:
+            # Another thread may have built it meanwhile, and the entry may
+            # have been forgotten
+            if entry.grammar is None:
+                entry.grammar = grammar
+                if key in self._entries:
+                    self._update(key)
+            return entry.grammar
+    
+    def resident_parser(self, key, parser_type):
+        """Return the compiled table of a grammar if it is resident and the
+        table is already built, else None; never builds anything"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.grammar is None:
+                return None
+            if parser_type == 'LL1':
+                compiled = entry.grammar._ll1_table
+            else:
+                compiled = entry.grammar._slr1_automaton
+            if compiled is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self._resident.move_to_end(key)
+            return compiled
+    
+    def check_ll1(self, key):
+        """Whether the grammar is LL(1), remembered across evictions"""
+        entry = self._entries.get(key)
+        if entry is None or entry.ll1 is None:
+            return self.compile_parser(key, 'LL1').is_ll1()
+        return entry.ll1
+    
+    def check_slr1(self, key):
+        """Whether the grammar is SLR(1), remembered across evictions"""
+        entry = self._entries.get(key)
+        if entry is None or entry.slr1 is None:
+            return self.compile_parser(key, 'SLR1').is_slr1()
+        return entry.slr1
+    
+    def compile_parser(self, key, parser_type):
+        """Return the compiled table of a grammar for 'LL1' or 'SLR1'"""
+        compiled = self.grammar(key).compile_parser(parser_type)
+        with self._lock:
+            # The entry may have been forgotten meanwhile
+            entry = self._entries.get(key)
+            if entry is None:
+                return compiled
+            if parser_type == 'LL1':
+                entry.ll1 = compiled.is_ll1()
+            else:
+                entry.slr1 = compiled.is_slr1()
+            
+            # The new table counts towards the budget
+            if entry.grammar is not None:
+                self._update(key)
+        return compiled
+    
+    def _update(self, key):
+        """Re-estimate the size of a resident grammar and evict to fit the budget"""
+        entry = self._entries[key]
+        self.resident_bytes -= entry.size
+        entry.size = estimate_grammar_size(entry.grammar)
+        self.resident_bytes += entry.size
+        self._resident[key] = entry
+        self._resident.move_to_end(key)
+        
+        # The grammar just used stays, even if it alone is over the budget
+        while self.resident_bytes > self.max_bytes and len(self._resident) > 1:
+            _, oldest = self._resident.popitem(last=False)
+            self.resident_bytes -= oldest.size
+            oldest.grammar = None
+            oldest.size = 0
+            self.evictions += 1
+        self._forget(key)
+    
+    def _forget(self, keep=None):
+        """Drop the least recently used evicted entries past max_grammars"""
+        excess = len(self._entries) - self.max_grammars
+        if excess <= 0:
+            return
+        for key in [key for key, entry in self._entries.items()
+                    if entry.grammar is None and key != keep][:excess]:
+            del self._entries[key]
+            self.forgotten += 1
+    
+    def evict(self, key):
+        """Drop a resident grammar now; it is rebuilt on its next use"""
+        with self._lock:
+            entry = self._resident.pop(key, None)
+            if entry is not None:
+                self.resident_bytes -= entry.size
+                entry.grammar = None
+                entry.size = 0
+                self.evictions += 1
+                self._forget()
+    
+    def summary(self):
+        """Return the counters and memory use of the registry as a dict"""
+        with self._lock:
+            return {'grammars': len(self._entries), 'resident': len(self._resident),
+                    'resident_bytes': self.resident_bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'rebuilds': self.rebuilds,
+                    'evictions': self.evictions, 'forgotten': self.forgotten}
+
+
+def read_lines(stream, chunk_size=1 << 16):
+    """Yield the lines of a text stream, reading it in large chunks"""
+    
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        yield from lines
+    
+    # Last line without a trailing newline
+    if pending:
+        yield pending
+
+
+def read_file_lines(path):
+    """Yield the lines of a file through a read-only memory map"""
+    
+    with open(path, 'rb') as f:
+        # An empty file cannot be mapped
+        if not f.seek(0, 2):
+            return
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            end = len(data)
+            while start < end:
+                newline = data.find(b'\n', start)
+                if newline < 0:
+                    newline = end
+                line = data[start:newline]
+                if line.endswith(b'\r'):
+                    line = line[:-1]
+                yield line.decode()
+                start = newline + 1
+
+
+def _next_line(lines):
+    """Read one line from a batch line iterator, or with input() when there is none"""
+    
+    if lines is None:
+        return input()
+    for line in lines:
+        return line
+    raise EOFError
+
+
+def parse_grammar(lines=None, cache_dir=None, stats=None, registry=None):
+    """Parse grammar from user input, through the on-disk cache if cache_dir is given.
+    
+    ``stats`` is an optional GrammarStats for the new Grammar. With a
+    GrammarRegistry the shared instance is returned instead, and the
+    registry's cache directory and stats apply.
+    """
+    
+    # Read number of nonterminals
+    n = int(_next_line(lines))
+    
+    productions = {}
+    
+    # Read productions
+    for _ in range(n):
+        line = _next_line(lines).strip()
+        parts = line.split(' -> ')
+        nt = parts[0]
+        rules = parts[1].split()
+        
+        if nt not in productions:
+            productions[nt] = []
+        
+        for rule in rules:
+            productions[nt].append(list(rule))
+    
+    if registry is not None:
+        return registry.get(productions)
+    if cache_dir is not None:
+        return load_grammar(productions, cache_dir, stats=stats)
+    return Grammar(productions, stats=stats)
+
+
+# One word of a named grammar rule: a quoted literal, ->, | or a bare name
+_RULE_WORD = re.compile(r"""'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|->|\||[^\s|'"]+""")
+
+
+def _check_token_regex(number, what, regex):
+    """Reject a token or ignore pattern the Tokenizer could not scan with"""
+    if not regex:
+        raise ValueError("line %d: %s has no regular expression" % (number, what))
+    try:
+        matches_empty = re.fullmatch(regex, '') is not None
+    except re.error as error:
+        raise ValueError("line %d: bad regular expression for %s: %s" % (number, what, error))
+    if matches_empty:
+        raise ValueError("line %d: %s matches the empty string" % (number, what))
+
+
+def parse_named_grammar(text, cache_dir=None, stats=None, registry=None):
+    """Parse a grammar whose symbols are names of any length.
+    
+    One directive or rule per line; lines starting with # are comments:
+    
+        %token NUM [0-9]+         terminal class NUM, given by a regular expression
+        %ignore \s+|//[^\n]*       text skipped between tokens (default: whitespace)
+        %start expr               start symbol (default: left side of the first rule)
+        expr -> expr '+' term | term
+              | '-' expr          a line starting with | continues the previous rule
+        opt -> 'x' | ε            an empty alternative (or ε) is the empty production
+    
+    Quoted words are literal terminals, names declared with %token are
+    terminal classes and every other name is a nonterminal. e and $ are
+    reserved, and token patterns may not match the empty string. The
+    returned Grammar carries a Tokenizer for its terminals, so its parse
+    methods accept raw text.
+    """
+    
+    productions = {}
+    patterns = []
+    ignore = []
+    start = None
+    literals = set()
+    current = None
+    
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        
+        if line.startswith('%'):
+            directive, _, argument = line.partition(' ')
+            argument = argument.strip()
+            if directive == '%token':
+                name, _, regex = argument.partition(' ')
+                regex = regex.strip()
+                _check_token_regex(number, '%token ' + name, regex)
+                patterns.append((name, regex))
+            elif directive == '%ignore':
+                _check_token_regex(number, '%ignore', argument)
+                ignore.append(argument)
+            elif directive == '%start':
+                start = argument
+            else:
+                raise ValueError("line %d: unknown directive %s" % (number, directive))
+            continue
+        
+        words = _RULE_WORD.findall(line)
+        for word in words:
+            # Bare e and $ would be read as the empty production and the end marker
+            if word in ('e', '$'):
+                raise ValueError("line %d: %s cannot be used as a nonterminal" % (number, word))
+        if len(words) >= 2 and words[1] == '->':
+            current = words[0]
+            productions.setdefault(current, [])
+            words = words[2:]
+        elif words and words[0] == '|' and current is not None:
+            words = words[1:]
+        else:
+            raise ValueError("line %d: expected 'name -> ...' or '| ...'" % number)
+        
+        alternative = []
+        for word in words + ['|']:
+            if word == '|':
+                productions[current].append(alternative)
+                alternative = []
+            elif word == 'ε':
+                continue
+            elif word[0] in '\'"':
+                literal = ast.literal_eval(word)
+                literals.add(literal)
+                alternative.append(literal)
+            else:
+                alternative.append(word)
+    
+    if not productions:
+        raise ValueError("the grammar has no rules")
+    start = start or next(iter(productions))
+    if start not in productions:
+        raise ValueError("start symbol %s has no rules" % start)
+    
+    token_names = {name for name, _ in patterns}
+    nonterminals = {symbol for prods in productions.values() for prod in prods
+                    for symbol in prod if symbol not in literals and symbol not in token_names}
+    nonterminals.update(productions)
+    
+    for symbol in literals | token_names:
+        if symbol in ('', 'e', '$'):
+            raise ValueError("%r cannot be used as a terminal" % symbol)
+        if symbol in nonterminals:
+            raise ValueError("%r is both a terminal and a nonterminal" % symbol)
+    if literals & token_names:
+        raise ValueError("%r is both a literal and a token class" % min(literals & token_names))
+    
+    tokenizer = Tokenizer(literals, patterns, ignore or (r'\s+',))
+    if registry is not None:
+        return registry.get(productions, start, nonterminals, tokenizer)
+    if cache_dir is not None:
+        return load_grammar(productions, cache_dir, start, nonterminals, tokenizer, stats)
+    return Grammar(productions, start, nonterminals, tokenizer, stats)
+
+
+def load_grammar_file(path, cache_dir=None, stats=None, registry=None):
+    """Read a grammar file in the project input format or the named format"""
+    
+    with open(path) as f:
+        return parse_grammar_text(f.read(), cache_dir, stats, registry)
+
+
+def parse_grammar_text(text, cache_dir=None, stats=None, registry=None):
+    """Parse a grammar in the project input format or the named format"""
+    
+    # The project format starts with the number of rules
+    first_line = text.lstrip().split('\n', 1)[0].strip()
+    if first_line.isdigit():
+        return parse_grammar(iter(text.splitlines()), cache_dir, stats, registry)
+    return parse_named_grammar(text, cache_dir, stats, registry)
+
+
+def recognize(grammar, parser_type, lines):
+    """Yield whether each line is accepted, stopping at the first empty line"""
+    
+    compiled = grammar.compile_parser(parser_type)
+    if grammar.stats is not None:
+        def parse(string):
+            return compiled.trace(string, grammar.stats)
+    else:
+        parse = compiled.parse
+    
+    for string in lines:
+        if not string:
+            return
+        yield parse(string)
+
+
+def _take_chunks(lines, chunk_size):
+    """Join up to chunk_size lines per block, stopping at the first empty line.
+    
+    A single string per chunk is much cheaper to send to a worker than a
+    list of many small ones.
+    """
+    
+    chunk = []
+    for string in lines:
+        if not string:
+            break
+        chunk.append(string)
+        if len(chunk) >= chunk_size:
+            yield '\n'.join(chunk)
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk)
+
+
+# Set in each worker process by _init_worker
+_worker_memory = None
+_worker_parser = None
+
+
+def _init_worker(memory_name, kind, header, tokenizer):
+    """Attach a worker process to the table published in shared memory"""
+    
+    global _worker_memory, _worker_parser
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    _worker_parser = PackedParser(kind, header, _worker_memory.buf, tokenizer)
+
+
+def _parse_chunk(chunk):
+    """Parse a chunk of strings in a worker and return the answers as text"""
+    
+    parse = _worker_parser.parse
+    return ''.join(["yes\n" if parse(string) else "no\n" for string in chunk.split('\n')])
+
+
+def parse_strings_parallel(grammar, parser_type, lines, jobs=None, out=None,
+                           chunk_size=2048):
+    """Parse lines in a pool of worker processes, writing answers in input order.
+    
+    The compiled table is built once, copied into a shared memory block that
+    every worker maps, and chunks of ``chunk_size`` strings are sent to the
+    workers. ``jobs`` defaults to the number of CPUs. The output is identical
+    to parse_strings.
+    """
+    
+    write = (out or sys.stdout).write
+    jobs = jobs or os.cpu_count() or 1
+    compiled = grammar.compile_parser(parser_type)
+    kind, header, table = compiled.pack()
+    
+    memory = shared_memory.SharedMemory(create=True, size=max(len(table), 1))
+    try:
+        memory.buf[:len(table)] = table
+        
+        with multiprocessing.Pool(jobs, _init_worker, (memory.name, kind, header, compiled.tokenizer)) as pool:
+            # Keep a bounded window of chunks in flight so that a huge input
+            # is never read into memory all at once
+            pending = deque()
+            for chunk in _take_chunks(lines, chunk_size):
+                pending.append(pool.apply_async(_parse_chunk, (chunk,)))
+                if len(pending) >= 4 * jobs:
+                    write(pending.popleft().get())
+            while pending:
+                write(pending.popleft().get())
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def parse_strings(grammar, parser_type, lines=None, out=None, batch_size=4096, jobs=1,
+                  share_prefixes=False, lockstep=False):
+    """Parse strings using the specified parser.
+    
+    Without ``lines`` strings are read one by one with input(). With a line
+    iterator (see read_lines and read_file_lines) the answers are written to
+    ``out`` (stdout by default) in blocks of ``batch_size`` lines, and
+    ``jobs`` other than 1 hands them to parse_strings_parallel. With
+    ``share_prefixes`` or ``lockstep`` every block goes through
+    Grammar.parse_batch or Grammar.parse_lockstep instead.
+    """
+    
+    if lines is not None and (share_prefixes or lockstep):
+        write = (out or sys.stdout).write
+        parse_block = grammar.parse_lockstep if lockstep else grammar.parse_batch
+        block = []
+        for string in lines:
+            if not string:
+                break
+            block.append(string)
+            if len(block) >= batch_size:
+                write(''.join(["yes\n" if result else "no\n"
+                               for result in parse_block(parser_type, block)]))
+                block = []
+        write(''.join(["yes\n" if result else "no\n"
+                       for result in parse_block(parser_type, block)]))
+        return
+    
+    if lines is not None and jobs != 1:
+        parse_strings_parallel(grammar, parser_type, lines, jobs or None, out)
+        return
+    
+    if lines is not None:
+        write = (out or sys.stdout).write
+        answers = []
+        for result in recognize(grammar, parser_type, lines):
+            answers.append("yes\n" if result else "no\n")
+            if len(answers) >= batch_size:
+                write(''.join(answers))
+                answers.clear()
+        write(''.join(answers))
+        return
+    
+    while True:
+        try:
+            string = input()
+            if not string:
+                break
+            
+            if parser_type == 'LL1':
+                result = grammar.parse_ll1(string)
+            else:  # SLR1
+                result = grammar.parse_slr1(string)
+            
+            print("yes" if result else "no")
+        except EOFError:
+            break
+
+
+def parse_args(argv=None):
+    """Parse the command line options"""
+    
+    parser = argparse.ArgumentParser(description="LL(1) and SLR(1) parsers")
+    parser.add_argument('--batch', action='store_true',
+                        help="read stdin in large chunks and buffer the answers")
+    parser.add_argument('--input', metavar='FILE',
+                        help="read the whole session from FILE (memory-mapped) "
+                             "instead of stdin; implies --batch")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="parse strings in N worker processes (0: one per CPU); "
+                             "implies --batch")
+    parser.add_argument('--grammar', metavar='FILE',
+                        help="read the grammar from FILE (project or named format); "
+                             "stdin then only holds the parser choices and strings")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="reuse FIRST/FOLLOW and the parsing tables cached in DIR")
+    parser.add_argument('--stats', action='store_true',
+                        help="print phase times and parser counters as JSON to stderr "
+                             "at exit; strings are then parsed in this process")
+    parser.add_argument('--share-prefixes', action='store_true',
+                        help="parse blocks of strings in sorted order, resuming each from "
+                             "the prefix it shares with the previous one; implies --batch "
+                             "and parses in this process")
+    parser.add_argument('--lockstep', action='store_true',
+                        help="parse blocks of strings all at once with NumPy (one by one "
+                             "if it is not installed); implies --batch and parses in this "
+                             "process")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function"""
+    
+    args = parse_args(argv)
+    
+    # Batch mode reads every line (grammar, choices and strings) from one iterator
+    lines = None
+    if args.input:
+        lines = read_file_lines(args.input)
+    elif args.batch or args.jobs != 1 or args.share_prefixes or args.lockstep:
+        lines = read_lines(sys.stdin)
+    
+    # The parse counters and the block parsers only work in this process
+    stats = GrammarStats() if args.stats else None
+    jobs = 1 if args.stats or args.share_prefixes or args.lockstep else args.jobs
+    block_options = {'share_prefixes': args.share_prefixes, 'lockstep': args.lockstep}
+    
+    if args.grammar:
+        grammar = load_grammar_file(args.grammar, args.cache_dir, stats)
+    else:
+        grammar = parse_grammar(lines, args.cache_dir, stats)
+    
+    # Check if grammar is LL(1) and/or SLR(1)
+    is_ll1 = grammar.check_ll1()
+    is_slr1 = grammar.check_slr1()
+    
+    if is_ll1 and is_slr1:
+        print("Select a parser (T: for LL(1), B: for SLR(1), Q: quit):")
+        
+        while True:
+            try:
+                choice = _next_line(lines).strip().upper()
+                if choice == 'T':
+                    parse_strings(grammar, 'LL1', lines, jobs=jobs, **block_options)
+                    print("Select a parser (T: for LL(1), B: for SLR(1), Q: quit):")
+                elif choice == 'B':
+                    parse_strings(grammar, 'SLR1', lines, jobs=jobs, **block_options)
+                    print("Select a parser (T: for LL(1), B: for SLR(1), Q: quit):")
+                elif choice == 'Q':
+                    break
+            except EOFError:
+                break
+    elif is_ll1:
+        print("Grammar is LL(1).")
+        parse_strings(grammar, 'LL1', lines, jobs=jobs, **block_options)
+    elif is_slr1:
+        print("Grammar is SLR(1).")
+        parse_strings(grammar, 'SLR1', lines, jobs=jobs, **block_options)
+    else:
+        print("Grammar is neither LL(1) nor SLR(1).")
+    
+    if stats is not None:
+        sys.stdout.flush()
+        json.dump(stats.summary(), sys.stderr, indent=2)
+        sys.stderr.write('\n')
+
+
+if __name__ == "__main__":
+    main()
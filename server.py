@@ -0,0 +1,376 @@
+"""
+Servidor de reconocimiento - an asyncio service that keeps compiled grammars resident
+
+Clients connect over localhost TCP or a Unix socket and send one JSON
+request per line; every request gets one JSON response line, in request
+order, echoing its "id":
+
+    {"id": 1, "op": "load", "grammar": "3\\nS -> S+T T\\nT -> T*F F\\nF -> (S) i"}
+    {"id": 1, "grammar": "<grammar id>", "ll1": false, "slr1": true}
+
+    {"id": 2, "op": "parse", "grammar": "<grammar id>", "strings": ["i+i", "(i"]}
+    {"id": 2, "results": ["yes", "no"]}
+
+"grammar" in a load request is the text of a grammar in the project input
+format or the named format. A parse request may name the parser ("LL1" or
+"SLR1"); by default it is LL(1) when the grammar is LL(1), as in
+project.py. {"id": ..., "op": "stats"} returns the registry counters.
+Failures are answered with {"id": ..., "error": "..."}.
+
+Requests can be pipelined. Parse requests for the same grammar and parser
+arriving close together, from any connection, are run as one batch.
+Grammars are compiled in a thread pool, with a limit on concurrent
+compilations, and so are grammars rebuilt after an eviction, so a large
+grammar does not hold up requests for the others. A grammar id the
+registry has forgotten (see GrammarRegistry) is answered with an error
+and the grammar must be loaded again.
+Each connection has a limit on unanswered requests; past it the server
+stops reading from that connection until responses have been written.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from project import GrammarRegistry, grammar_key, parse_grammar_text
+
+
+# The fields each op needs besides "op"
+_REQUIRED_FIELDS = {
+    'load': ('grammar',),
+    'parse': ('grammar', 'strings'),
+    'stats': (),
+}
+
+
+def _compile(text, registry):
+    """Parse and analyse a grammar and build both tables (run in a worker thread)"""
+    grammar = parse_grammar_text(text, registry=registry)
+    key = grammar_key(grammar.productions, grammar.start,
+                      grammar.declared_nonterminals, grammar.tokenizer)
+    registry.check_ll1(key)
+    registry.check_slr1(key)
+    return key
+
+
+def _parse_all(compiled, strings):
+    """Recognize a batch of strings (run in the parsing thread)"""
+    parse = compiled.parse
+    return [parse(string) for string in strings]
+
+
+class RecognitionServer:
+    """Grammars compiled once and shared by every connection.
+    
+    ``compile_workers`` bounds the compilations running at the same time,
+    ``max_pending`` the unanswered requests of one connection, and parse
+    requests are gathered for ``batch_delay`` seconds or until
+    ``batch_size`` strings are waiting before they run. The grammars live in
+    a GrammarRegistry of ``max_bytes`` and ``max_grammars``, so ids stay
+    valid after eviction until the registry forgets them.
+    """
+    
+    def __init__(self, compile_workers=2, max_pending=64, batch_size=4096,
+                 batch_delay=0.001, cache_dir=None, max_bytes=256 << 20, max_grammars=4096):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.registry = GrammarRegistry(max_bytes, cache_dir, max_grammars=max_grammars)
+        
+        # grammar text -> grammar id, for the most recently loaded texts
+        self._texts = OrderedDict()
+        self.max_texts = max_grammars
+        
+        # Compilations in progress, by grammar text, and rebuilds of evicted
+        # grammars, by (grammar id, parser type), so concurrent requests for
+        # one grammar share the work
+        self._loading = {}
+        self._rebuilding = {}
+        
+        self._compile_executor = ThreadPoolExecutor(compile_workers)
+        self._compile_slots = asyncio.Semaphore(compile_workers)
+        
+        # One thread runs the batches, keeping the event loop free for I/O
+        self._parse_executor = ThreadPoolExecutor(1)
+        
+        # (grammar id, parser type) -> [(strings, future)] waiting to run
+        self._batches = {}
+    
+    async def load(self, text):
+        """Compile a grammar, or find it already compiled, and return its id"""
+        
+        key = self._texts.get(text)
+        if key is not None and key in self.registry:
+            self._texts.move_to_end(text)
+            return key
+        
+        task = self._loading.get(text)
+        if task is None:
+            task = asyncio.ensure_future(self._compile(text))
+            self._loading[text] = task
+            task.add_done_callback(lambda _: self._loading.pop(text, None))
+        return await task
+    
+    async def _compile(self, text):
+        async with self._compile_slots:
+            loop = asyncio.get_running_loop()
+            key = await loop.run_in_executor(self._compile_executor, _compile,
+                                             text, self.registry)
+        
+        # Identical grammars written differently share one registry entry
+        self._texts[text] = key
+        self._texts.move_to_end(text)
+        if len(self._texts) > self.max_texts:
+            self._texts.popitem(last=False)
+        return key
+    
+    async def compiled_parser(self, key, parser_type):
+        """Return the compiled table of a grammar, rebuilding an evicted
+        grammar in the compilation pool rather than the parsing thread"""
+        
+        compiled = self.registry.resident_parser(key, parser_type)
+        if compiled is not None:
+            return compiled
+        
+        task = self._rebuilding.get((key, parser_type))
+        if task is None:
+            task = asyncio.ensure_future(self._rebuild(key, parser_type))
+            self._rebuilding[key, parser_type] = task
+            task.add_done_callback(lambda _: self._rebuilding.pop((key, parser_type), None))
+        return await task
+    
+    async def _rebuild(self, key, parser_type):
+        async with self._compile_slots:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._compile_executor,
+                                                  self.registry.compile_parser, key, parser_type)
+            except KeyError:
+                # Forgotten since the request was checked
+                raise ValueError("unknown grammar %s" % key)
+    
+    def parser_type(self, key, parser_type=None):
+        """Check (or choose, like project.py) the parser for a loaded grammar"""
+        
+        if key not in self.registry:
+            raise ValueError("unknown grammar %s" % key)
+        is_ll1, is_slr1 = self.registry.check_ll1(key), self.registry.check_slr1(key)
+        
+        if parser_type is None:
+            if not (is_ll1 or is_slr1):
+                raise ValueError("Grammar is neither LL(1) nor SLR(1).")
+            return 'LL1' if is_ll1 else 'SLR1'
+        if parser_type == 'LL1' and not is_ll1:
+            raise ValueError("grammar is not LL(1)")
+        if parser_type == 'SLR1' and not is_slr1:
+            raise ValueError("grammar is not SLR(1)")
+        if parser_type not in ('LL1', 'SLR1'):
+            raise ValueError("unknown parser %s" % parser_type)
+        return parser_type
+    
+    async def recognize(self, key, strings, parser_type=None):
+        """Return whether each string is accepted, batched with other requests"""
+        
+        batch_key = (key, self.parser_type(key, parser_type))
+        future = asyncio.get_running_loop().create_future()
+        
+        batch = self._batches.setdefault(batch_key, [])
+        batch.append((strings, future))
+        if len(batch) == 1:
+            asyncio.get_running_loop().call_later(
+                self.batch_delay, self._start_batch, batch_key, batch)
+        elif sum(len(request[0]) for request in batch) >= self.batch_size:
+            self._start_batch(batch_key, batch)
+        
+        return await future
+    
+    def _start_batch(self, batch_key, batch):
+        # The timer of a batch that already ran because it filled up finds
+        # another list, or none, under its key
+        if self._batches.get(batch_key) is batch:
+            del self._batches[batch_key]
+            asyncio.ensure_future(self._run_batch(batch_key, batch))
+    
+    async def _run_batch(self, batch_key, batch):
+        key, parser_type = batch_key
+        strings = [string for request_strings, _ in batch for string in request_strings]
+        
+        try:
+            # The batch holds on to the table, so the parsing thread only
+            # parses even if the grammar is evicted meanwhile
+            compiled = await self.compiled_parser(key, parser_type)
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self._parse_executor, _parse_all,
+                                                 compiled, strings)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        
+        # Hand every request its slice of the answers
+        start = 0
+        for request_strings, future in batch:
+            end = start + len(request_strings)
+            if not future.done():
+                future.set_result(results[start:end])
+            start = end
+    
+    async def handle_request(self, request):
+        """Answer one decoded request with a response dict"""
+        
+        response = {'id': request.get('id')}
+        try:
+            op = request.get('op')
+            fields = _REQUIRED_FIELDS.get(op)
+            if fields is None:
+                raise ValueError("unknown op %r" % op)
+            missing = [field for field in fields if field not in request]
+            if missing:
+                raise ValueError("missing field %s" % ', '.join(map(repr, missing)))
+            
+            if op == 'load':
+                key = await self.load(request['grammar'])
+                response.update(grammar=key, ll1=self.registry.check_ll1(key),
+                                slr1=self.registry.check_slr1(key))
+            elif op == 'parse':
+                strings = request['strings']
+                if not isinstance(strings, list) or not all(isinstance(s, str) for s in strings):
+                    raise ValueError("strings must be a list of strings")
+                results = await self.recognize(request['grammar'], strings,
+                                               request.get('parser'))
+                response['results'] = ["yes" if result else "no" for result in results]
+            else:
+                response['registry'] = self.registry.summary()
+        except KeyError as error:
+            # Raised while compiling, e.g. by a grammar without rules for S
+            response['error'] = "KeyError: %s" % error
+        except Exception as error:
+            response['error'] = str(error) or type(error).__name__
+        return response
+    
+    async def _answer(self, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as error:
+            return {'id': None, 'error': "bad request: %s" % error}
+        return await self.handle_request(request)
+    
+    async def handle_connection(self, reader, writer):
+        """Serve one client: read requests, answer them in order"""
+        
+        slots = asyncio.Semaphore(self.max_pending)
+        responses = asyncio.Queue()
+        
+        async def write_responses():
+            while True:
+                task = await responses.get()
+                if task is None:
+                    break
+                response = await task
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+                slots.release()
+        
+        writer_task = asyncio.ensure_future(write_responses())
+        try:
+            while True:
+                # Stop reading while too many requests are unanswered
+                await slots.acquire()
+                line = await reader.readline()
+                if not line:
+                    slots.release()
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                await responses.put(asyncio.ensure_future(self._answer(line)))
+            await responses.put(None)
+            await writer_task
+        except (ConnectionError, ValueError):
+            # Connection lost, or a request line longer than the stream limit
+            writer_task.cancel()
+        finally:
+            writer.close()
+    
+    async def serve_tcp(self, host='127.0.0.1', port=0):
+        """Start listening on a TCP port and return the asyncio server"""
+        return await asyncio.start_server(self.handle_connection, host, port, limit=1 << 24)
+    
+    async def serve_unix(self, path):
+        """Start listening on a Unix socket and return the asyncio server"""
+        return await asyncio.start_unix_server(self.handle_connection, path, limit=1 << 24)
+    
+    def close(self):
+        """Stop the worker threads"""
+        self._compile_executor.shutdown(wait=False)
+        self._parse_executor.shutdown(wait=False)
+
+
+async def _serve(args):
+    server = RecognitionServer(args.compile_workers, args.max_pending, args.batch_size,
+                               args.batch_delay, args.cache_dir, args.max_memory << 20,
+                               args.max_grammars)
+    
+    for path in args.grammar or ():
+        with open(path) as f:
+            key = await server.load(f.read())
+        print("%s %s" % (key, path), flush=True)
+    
+    if args.unix:
+        listener = await server.serve_unix(args.unix)
+        print("listening on %s" % args.unix, flush=True)
+    else:
+        host, _, port = args.tcp.rpartition(':')
+        listener = await server.serve_tcp(host or '127.0.0.1', int(port))
+        print("listening on %s:%d" % listener.sockets[0].getsockname()[:2], flush=True)
+    
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+        if args.unix and os.path.exists(args.unix):
+            os.unlink(args.unix)
+
+
+def main(argv=None):
+    """Serve LL(1)/SLR(1) recognition requests over TCP or a Unix socket"""
+    
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--tcp', default='127.0.0.1:8765', metavar='HOST:PORT',
+                        help="listen on this TCP address (default: %(default)s)")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead")
+    parser.add_argument('--grammar', action='append', metavar='FILE',
+                        help="load a grammar at startup and print its id (repeatable)")
+    parser.add_argument('--compile-workers', type=int, default=2, metavar='N',
+                        help="grammars compiled at the same time")
+    parser.add_argument('--max-pending', type=int, default=64, metavar='N',
+                        help="unanswered requests per connection before reading pauses")
+    parser.add_argument('--batch-size', type=int, default=4096, metavar='N',
+                        help="run a batch as soon as it holds N strings")
+    parser.add_argument('--batch-delay', type=float, default=0.001, metavar='SECONDS',
+                        help="how long parse requests are gathered into one batch")
+    parser.add_argument('--max-memory', type=int, default=256, metavar='MB',
+                        help="estimated memory for resident grammars before the least "
+                             "recently used are dropped (default: %(default)s)")
+    parser.add_argument('--max-grammars', type=int, default=4096, metavar='N',
+                        help="grammar ids remembered, resident or not, before the least "
+                             "recently used evicted ones are forgotten (default: %(default)s)")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="reuse FIRST/FOLLOW and the parsing tables cached in DIR")
+    args = parser.parse_args(argv)
+    
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()